@@ -0,0 +1,69 @@
+# benchmarks/bench_cooldown.py
+"""
+Cooldown check cost: parsing last_triggered_at on every evaluation versus the
+expiry pre-parsed onto the watch by WatchlistManager.
+
+    python -m benchmarks.bench_cooldown --n 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from rules.cooldown import CooldownManager, prepare_cooldown
+from rules.factory import create_rule_from_watch
+
+
+def timed(fn, n):
+    started = time.perf_counter()
+    fn(n)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="evaluations per variant")
+    args = parser.parse_args()
+
+    last = (datetime.utcnow() - timedelta(minutes=3)).isoformat(timespec="microseconds")
+    watch = {"id": 1, "symbol": "TEST", "rule": "ABOVE", "threshold": 100.0, "cooldown_minutes": 5,
+             "enabled": True, "last_triggered_state": False, "last_triggered_at": last}
+    prepared = dict(watch)
+    prepare_cooldown(prepared)
+    cooldown = CooldownManager(5)
+    rule = create_rule_from_watch(watch)
+
+    def old_check(n):
+        for _ in range(n):
+            cooldown.is_cooldown_over(last)
+
+    def new_check(n):
+        until = prepared["_cooldown_until"]
+        for _ in range(n):
+            CooldownManager.is_expired(until)
+
+    def old_should_trigger(n):
+        for _ in range(n):
+            rule.should_trigger(101.0, watch)
+
+    def new_should_trigger(n):
+        for _ in range(n):
+            rule.should_trigger(101.0, prepared)
+
+    # both paths must agree before their speed means anything
+    assert cooldown.is_cooldown_over(last) == CooldownManager.is_expired(prepared["_cooldown_until"])
+    assert rule.should_trigger(101.0, watch) == rule.should_trigger(101.0, prepared)
+
+    results = {"n": args.n}
+    for name, fn in [("cooldown_parse_iso", old_check), ("cooldown_preparsed", new_check),
+                     ("should_trigger_parse_iso", old_should_trigger), ("should_trigger_preparsed", new_should_trigger)]:
+        elapsed = timed(fn, args.n)
+        results[name] = {"seconds": round(elapsed, 4), "ns_per_eval": round(elapsed / args.n * 1e9, 1)}
+    results["cooldown_speedup"] = round(results["cooldown_parse_iso"]["seconds"] / results["cooldown_preparsed"]["seconds"], 2)
+    results["should_trigger_speedup"] = round(
+        results["should_trigger_parse_iso"]["seconds"] / results["should_trigger_preparsed"]["seconds"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/bench_engine.py
+"""
+Throughput / latency benchmark for engine.alert_engine.alert_engine.
+
+Builds an offline WatchlistManager from a synthetic watchlist, feeds a
+generated tick stream through the real engine loop with Telegram and
+storage replaced by counters, and prints one JSON document:
+
+    python -m benchmarks.bench_engine --securities 50 --watches 1000 \
+        --rule-mix ABOVE=0.45,BELOW=0.45,PERCENT_MOVE=0.1 --ticks 50000 --out bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from core.watchlist_manager import WatchlistManager
+from engine.alert_engine import alert_engine
+from benchmarks.synthetic import make_watches, make_ticks, NullDispatcher, NullStateStore
+
+
+class _Done(Exception):
+    pass
+
+
+class TimedQueue(asyncio.Queue):
+    """
+    Price queue that measures how long the engine spent on each tick: the
+    engine handles one tick between two get() calls. Raises _Done once the
+    stream is exhausted so the engine loop returns.
+    """
+
+    def __init__(self, ticks, trace_alloc=False):
+        super().__init__()
+        for t in ticks:
+            self.put_nowait(t)
+        self.trace_alloc = trace_alloc
+        self.latencies = []
+        self.alloc_bytes = []
+        self._started = None
+
+    async def get(self):
+        now = time.perf_counter()
+        if self._started is not None:
+            self.latencies.append(now - self._started)
+            if self.trace_alloc:
+                current, peak = tracemalloc.get_traced_memory()
+                self.alloc_bytes.append(peak - self._mem_before)
+        if self.empty():
+            raise _Done()
+        item = self.get_nowait()
+        if self.trace_alloc:
+            tracemalloc.reset_peak()
+            self._mem_before = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return item
+
+
+def parse_rule_mix(text):
+    mix = {}
+    for part in text.split(","):
+        rule, weight = part.split("=")
+        mix[rule.strip().upper()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_quiet(coro):
+    # keep engine console output out of the JSON report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(coro)
+
+
+async def drive(watches, ticks, vectorized, trace_alloc):
+    wl_manager = WatchlistManager(None, None)
+    wl_manager.load_watches(watches)
+    dispatcher, state_store = NullDispatcher(), NullStateStore()
+    queue = TimedQueue(ticks, trace_alloc)
+
+    blocks_before = sys.getallocatedblocks()
+    started = time.perf_counter()
+    try:
+        await alert_engine(queue, wl_manager, dispatcher, state_store, vectorized=vectorized)
+    except _Done:
+        pass
+    elapsed = time.perf_counter() - started
+    blocks_after = sys.getallocatedblocks()
+
+    lat = sorted(queue.latencies)
+    result = {
+        "ticks": len(ticks),
+        "seconds": round(elapsed, 4),
+        "ticks_per_s": round(len(ticks) / elapsed, 1),
+        "latency_us": {
+            "p50": round(percentile(lat, 50) * 1e6, 2),
+            "p99": round(percentile(lat, 99) * 1e6, 2),
+            "max": round(lat[-1] * 1e6, 2) if lat else 0.0,
+        },
+        "alerts": dispatcher.sent,
+        "state_writes": state_store.writes,
+        "retained_blocks_per_tick": round((blocks_after - blocks_before) / len(ticks), 3),
+        "rule_cache": wl_manager.rule_cache.stats(),
+    }
+    if trace_alloc:
+        result["peak_alloc_bytes_per_tick"] = round(sum(queue.alloc_bytes) / max(len(queue.alloc_bytes), 1), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--securities", type=int, default=50)
+    parser.add_argument("--watches", type=int, default=500, help="watches per security")
+    parser.add_argument("--rule-mix", type=parse_rule_mix, default=None,
+                        help="comma-separated RULE=weight, e.g. ABOVE=0.5,BELOW=0.5")
+    parser.add_argument("--ticks", type=int, default=50_000)
+    parser.add_argument("--vectorized", action="store_true", help="enable the NumPy evaluation path")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the (slower) tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    watches = make_watches(args.securities, args.watches, args.rule_mix, seed=args.seed)
+    ticks = make_ticks(args.securities, args.ticks, seed=args.seed + 1)
+
+    report = {
+        "benchmark": "alert_engine",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {
+            "securities": args.securities,
+            "watches_per_security": args.watches,
+            "rule_mix": args.rule_mix or "default",
+            "ticks": args.ticks,
+            "vectorized": args.vectorized,
+        },
+        "timing": run_quiet(drive(watches, ticks, args.vectorized, trace_alloc=False)),
+    }
+    if not args.no_alloc:
+        # fresh watch rows: the timing pass mutated trigger state in place
+        watches = make_watches(args.securities, args.watches, args.rule_mix, seed=args.seed)
+        tracemalloc.start()
+        alloc = run_quiet(drive(watches, ticks, args.vectorized, trace_alloc=True))
+        tracemalloc.stop()
+        report["allocations"] = {
+            "peak_alloc_bytes_per_tick": alloc["peak_alloc_bytes_per_tick"],
+            "retained_blocks_per_tick": alloc["retained_blocks_per_tick"],
+        }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
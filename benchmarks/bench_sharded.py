@@ -0,0 +1,63 @@
+# benchmarks/bench_sharded.py
+"""
+Ticks/s of the sharded alert engine for different shard counts.
+
+    python -m benchmarks.bench_sharded --shards 1 2 4 --securities 200 --watches 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from core.watchlist_manager import WatchlistManager
+from engine.sharded_engine import ShardedAlertEngine
+from benchmarks.synthetic import make_watches, make_ticks, NullDispatcher, NullStateStore
+
+
+async def run_once(num_shards, watches, ticks, batch_size):
+    wl_manager = WatchlistManager(None, None)
+    wl_manager.load_watches(watches)
+    dispatcher, state_store = NullDispatcher(), NullStateStore()
+
+    engine = ShardedAlertEngine(num_shards, wl_manager, dispatcher, state_store)
+    engine.start()
+    await engine.sync()  # wait until every shard has loaded its slice
+
+    started = time.perf_counter()
+    for i in range(0, len(ticks), batch_size):
+        engine.route(ticks[i:i + batch_size])
+    await engine.sync()
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0)  # deliver the last output batch
+
+    engine.stop()
+    return {
+        "shards": num_shards,
+        "ticks": len(ticks),
+        "seconds": round(elapsed, 4),
+        "ticks_per_s": round(len(ticks) / elapsed, 1),
+        "alerts": dispatcher.sent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--securities", type=int, default=200)
+    parser.add_argument("--watches", type=int, default=500, help="watches per security")
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=500, help="ticks per routed batch")
+    args = parser.parse_args()
+
+    watches = make_watches(args.securities, args.watches)
+    ticks = make_ticks(args.securities, args.ticks)
+
+    results = [asyncio.run(run_once(n, watches, ticks, args.batch)) for n in args.shards]
+    base = results[0]["ticks_per_s"]
+    for r in results:
+        r["speedup"] = round(r["ticks_per_s"] / base, 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/check_vector_eval.py
+"""
+Differential check: VectorBook.evaluate must fire and reset exactly the same
+watches as AlertRule.should_trigger / condition_met on the object path.
+
+    python -m benchmarks.check_vector_eval --cases 2000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from engine.vector_eval import VectorBook, _utc_epoch
+from rules.cooldown import prepare_cooldown
+from rules.factory import create_rule_from_watch
+
+
+def random_watch(rng, i, now):
+    cooldown = rng.choice([0, 1, 5, 15])
+    last = None
+    if rng.random() < 0.6:
+        # keep clear of the exact cooldown boundary, where both paths race utcnow()
+        offset = cooldown * 60 + rng.choice([-1, 1]) * rng.uniform(2, 600)
+        last = (now - timedelta(seconds=max(offset, 0))).isoformat(timespec="microseconds")
+    return {
+        "id": i,
+        "symbol": "TEST",
+        "rule": rng.choice(["ABOVE", "BELOW", "above", "below"]),
+        "threshold": round(rng.uniform(90, 110), 2),
+        "cooldown_minutes": cooldown,
+        "enabled": rng.random() < 0.85,
+        "last_triggered_state": rng.random() < 0.4,
+        "last_triggered_at": last,
+    }
+
+
+def object_path(watches, price):
+    fire, reset = [], []
+    for i, w in enumerate(watches):
+        rule = create_rule_from_watch(w)
+        if rule.should_trigger(price, w):
+            fire.append(i)
+        elif not rule.condition_met(price) and w.get("last_triggered_state"):
+            reset.append(i)
+    return fire, reset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--watches", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for case in range(args.cases):
+        now = datetime.utcnow()
+        watches = [random_watch(rng, i, now) for i in range(args.watches)]
+        for w in watches:
+            prepare_cooldown(w)
+        # prices exactly on a threshold exercise the strict > / < comparisons
+        price = rng.choice([round(rng.uniform(88, 112), 2), watches[0]["threshold"]])
+
+        expected = object_path(watches, price)
+        fire, reset = VectorBook(watches).evaluate(price, _utc_epoch(datetime.utcnow()))
+        got = (fire.tolist(), reset.tolist())
+        if got != expected:
+            raise SystemExit(f"case {case}: vectorized {got} != object path {expected}")
+
+    print(f"OK: {args.cases} cases x {args.watches} watches match")
+
+
+if __name__ == "__main__":
+    main()
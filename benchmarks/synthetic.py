@@ -0,0 +1,81 @@
+# benchmarks/synthetic.py
+import random
+
+from core.ticks import Tick
+
+DEFAULT_RULE_MIX = {"ABOVE": 0.45, "BELOW": 0.45, "PERCENT_MOVE": 0.10}
+
+
+def make_watches(securities: int, watches_per_security: int, rule_mix=None, seed: int = 7):
+    """
+    Synthetic watch rows shaped like the Supabase `watches` table.
+    Thresholds sit within ±5% of each security's base price so ticks cross them.
+    """
+    rng = random.Random(seed)
+    rule_mix = rule_mix or DEFAULT_RULE_MIX
+    rules, weights = zip(*rule_mix.items())
+
+    watches = []
+    next_id = 1
+    for s in range(securities):
+        sec_id = str(1000 + s)
+        base = base_price(s)
+        for _ in range(watches_per_security):
+            rule = rng.choices(rules, weights)[0]
+            w = {
+                "id": next_id,
+                "user_id": rng.randint(1, 10_000),
+                "symbol": f"SYM{s}",
+                "security_id": sec_id,
+                "exchange": "NSE",
+                "rule": rule,
+                "threshold": round(base * rng.uniform(0.95, 1.05), 2),
+                "cooldown_minutes": 5,
+                "window_minutes": None,
+                "enabled": True,
+                "last_triggered_at": None,
+                "last_triggered_state": False,
+            }
+            if rule == "PERCENT_MOVE":
+                w["threshold"] = round(rng.uniform(0.5, 3), 2)
+                w["window_minutes"] = rng.choice([5, 10, 15])
+            watches.append(w)
+            next_id += 1
+    return watches
+
+
+def base_price(s: int) -> float:
+    return 100.0 + 37.0 * s
+
+
+def make_ticks(securities: int, count: int, seed: int = 11):
+    """Random-walk tick stream across `securities` securities, as FeedManager emits them."""
+    rng = random.Random(seed)
+    prices = [base_price(s) for s in range(securities)]
+    ticks = []
+    for n in range(count):
+        s = rng.randrange(securities)
+        prices[s] = max(1.0, prices[s] * (1 + rng.gauss(0, 0.002)))
+        ticks.append(Tick(str(1000 + s), round(prices[s], 2), 1_700_000_000 + n // 100))
+    return ticks
+
+
+class NullDispatcher:
+    """Counts alerts instead of sending them."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def enqueue(self, watch, price, description):
+        self.sent += 1
+        return True
+
+
+class NullStateStore:
+    """Counts trigger-state writes instead of persisting them."""
+
+    def __init__(self):
+        self.writes = 0
+
+    def record(self, watch_id, active_state, at=None):
+        self.writes += 1
@@ -14,7 +14,7 @@ async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         saved = add_watch(watch)
 
         await update.message.reply_text(
-            f"✅ Alert added for {saved['symbol']} {saved['rule']} {saved['threshold']}"
+            f"✅ Alert added for {saved['symbol']} {saved['rule']} {saved.get('expression') or saved['threshold']}"
         )
 
     except ValueError as e:
@@ -0,0 +1,218 @@
+# core/candles.py
+import asyncio
+import time
+from collections import deque
+
+from core.ticks import Tick
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "15m": 900}
+
+
+def parse_timeframes(spec: str | None) -> tuple:
+    """"1m,5m" -> (("1m", 60), ("5m", 300)); unknown names are rejected."""
+    names = [s.strip() for s in (spec or "").split(",") if s.strip()]
+    unknown = [n for n in names if n not in TIMEFRAMES]
+    if unknown:
+        raise ValueError(f"Unknown timeframe(s) {unknown}, expected some of {list(TIMEFRAMES)}")
+    return tuple((n, TIMEFRAMES[n]) for n in names)
+
+
+class Bar:
+    """OHLC bar covering [start, end) in exchange time (epoch seconds)."""
+
+    __slots__ = ("start", "end", "open", "high", "low", "close", "ticks")
+
+    def __init__(self, start: float, seconds: int, price: float):
+        self.start = start
+        self.end = start + seconds
+        self.open = self.high = self.low = self.close = price
+        self.ticks = 1
+
+    def update(self, price: float):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.ticks += 1
+
+    def __repr__(self):
+        return f"Bar({self.start}, O={self.open} H={self.high} L={self.low} C={self.close}, n={self.ticks})"
+
+
+class CandleBuilder:
+    """
+    Incremental OHLC bars per security for a fixed set of timeframes.
+
+    Bars are aligned to the epoch (so to IST 1m / 5m / 15m boundaries) and
+    built from each tick's LTT; a bar closes when the first tick of a later
+    bar arrives, or through close_due() for quiet securities. The last
+    `keep` closed bars per security and timeframe are kept for rules that
+    look back.
+    """
+
+    def __init__(self, timeframes=tuple(TIMEFRAMES.items()), keep: int = 100):
+        self.timeframes = tuple(timeframes)
+        self.keep = keep
+        self._open = {}     # sec_id -> [current Bar or None per timeframe]
+        self._closed = {}   # (sec_id, timeframe) -> deque of closed Bars
+
+    def update(self, sec_id, price: float, t: float):
+        """Fold a tick into the open bars; returns [(timeframe, Bar), ...] closed by it, or None."""
+        bars = self._open.get(sec_id)
+        if bars is None:
+            bars = self._open[sec_id] = [None] * len(self.timeframes)
+        closed = None
+        for i, (name, seconds) in enumerate(self.timeframes):
+            bar = bars[i]
+            if bar is not None and t < bar.end:
+                bar.update(price)  # a late tick (t < start) is folded into the open bar
+                continue
+            if bar is not None:
+                if closed is None:
+                    closed = []
+                closed.append((name, self._close(sec_id, name, bar)))
+            bars[i] = Bar(t - t % seconds, seconds, price)
+        return closed
+
+    def close_due(self, now: float):
+        """Close every open bar whose end is at or before `now`; returns [(sec_id, timeframe, Bar)]."""
+        closed = []
+        for sec_id, bars in self._open.items():
+            for i, (name, _) in enumerate(self.timeframes):
+                bar = bars[i]
+                if bar is not None and bar.end <= now:
+                    bars[i] = None
+                    closed.append((sec_id, name, self._close(sec_id, name, bar)))
+        return closed
+
+    def _close(self, sec_id, name, bar):
+        history = self._closed.get((sec_id, name))
+        if history is None:
+            history = self._closed[(sec_id, name)] = deque(maxlen=self.keep)
+        history.append(bar)
+        return bar
+
+    def current(self, sec_id, timeframe):
+        bars = self._open.get(str(sec_id))
+        if bars is None:
+            return None
+        for i, (name, _) in enumerate(self.timeframes):
+            if name == timeframe:
+                return bars[i]
+        return None
+
+    def history(self, sec_id, timeframe) -> deque:
+        return self._closed.get((str(sec_id), timeframe), deque())
+
+    def securities(self) -> list:
+        return list(self._open)
+
+    def drop(self, sec_id):
+        """Forget a security that is no longer subscribed."""
+        self._open.pop(sec_id, None)
+        for name, _ in self.timeframes:
+            self._closed.pop((sec_id, name), None)
+
+    def stats(self):
+        return {"securities": len(self._open), "timeframes": [n for n, _ in self.timeframes]}
+
+
+def bar_event(sec_id, timeframe, bar) -> Tick:
+    """Queue item announcing a closed bar; the engine evaluates bar-close watches on it."""
+    return Tick(sec_id, bar.close, bar.end, timeframe=timeframe, bar=bar)
+
+
+class CandleStage:
+    """
+    Price-stream stage between FeedManager.price_queue and the engine.
+
+    Drains ticks from `source`, folds them into the shared CandleBuilder and
+    hands the engine each tick followed by a bar event for every bar the tick
+    closed. Only securities for which `wanted(sec_id)` is true get bars
+    (default: all). With `close_interval`, bars of securities that stopped
+    ticking are closed on wall time (`grace` seconds after their end), checked
+    every `close_interval` seconds however busy the stream is (live only;
+    leave it None for replays, where wall time means nothing).
+    """
+
+    def __init__(self, source, builder: CandleBuilder, close_interval: float | None = None, grace: float = 2.0,
+                 wanted=None):
+        self.source = source
+        self.builder = builder
+        self.close_interval = close_interval
+        self.grace = grace
+        self.wanted = wanted
+        self._batched = hasattr(source, "get_batch")
+        self._next_close = time.monotonic() + (close_interval or 0)
+        self.bars_closed = 0
+
+    async def _next(self):
+        if self._batched:
+            return await self.source.get_batch()
+        return (await self.source.get(),)
+
+    def _close_due(self) -> list:
+        self._next_close = time.monotonic() + self.close_interval
+        due = self.builder.close_due(time.time() - self.grace)
+        self.bars_closed += len(due)
+        return [bar_event(sec_id, name, bar) for sec_id, name, bar in due]
+
+    async def get_batch(self) -> list:
+        while True:
+            if self.close_interval is None:
+                updates = await self._next()
+                break
+            wait = self._next_close - time.monotonic()
+            if wait <= 0:
+                due = self._close_due()
+                if due:
+                    return due
+            elif not self.source.empty():
+                updates = await self._next()
+                break
+            else:
+                try:
+                    updates = await asyncio.wait_for(self._next(), wait)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+
+        out = []
+        update_bars = self.builder.update
+        wanted = self.wanted
+        for update in updates:
+            out.append(update)
+            if update.timeframe:
+                continue  # bar event put back on the source by close_all()
+            sec_id = update.security_id
+            if wanted is not None and not wanted(sec_id):
+                continue
+            closed = update_bars(sec_id, update.price, update.ltt)
+            if closed:
+                self.bars_closed += len(closed)
+                out.extend(bar_event(sec_id, name, bar) for name, bar in closed)
+        return out
+
+    def close_all(self) -> list:
+        """Close every open bar (end of a replay) and return their bar events."""
+        due = self.builder.close_due(float("inf"))
+        self.bars_closed += len(due)
+        return [bar_event(sec_id, name, bar) for sec_id, name, bar in due]
+
+    def prune(self, *_):
+        """Drop the bars of securities `wanted` no longer covers; a WatchlistManager event listener."""
+        if self.wanted is None:
+            return
+        for sec_id in self.builder.securities():
+            if not self.wanted(sec_id):
+                self.builder.drop(sec_id)
+
+    def qsize(self) -> int:
+        return self.source.qsize()
+
+    def empty(self) -> bool:
+        return self.source.empty()
+
+    def stats(self):
+        return {"bars_closed": self.bars_closed, **self.builder.stats()}
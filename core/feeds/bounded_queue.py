@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from core import metrics
+
+DROP_OLDEST = "drop_oldest"
+DROP_OLDEST_PER_SECURITY = "drop_oldest_per_security"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, DROP_OLDEST_PER_SECURITY, BLOCK)
+
+QUEUE_DROPPED = metrics.counter("price_queue_dropped_total", "Ticks dropped because the price queue was full",
+                                ["policy"])
+QUEUE_STALE = metrics.counter("price_queue_stale_total", "Ticks discarded at dequeue because their LTT was too old")
+
+
+class BoundedPriceQueue:
+    """
+    Drop-in replacement for the FeedManager price queue with a size limit.
+
+    When `maxsize` ticks are pending the overflow policy decides:
+      drop_oldest               evict the oldest pending tick
+      drop_oldest_per_security  evict the oldest pending tick of the same
+                                security (it is superseded anyway), else the
+                                oldest overall
+      block                     the feed thread waits for a free slot (up to
+                                `block_timeout`, then the new tick is dropped)
+
+    With `max_age`, ticks whose LTT is more than `max_age` seconds behind
+    wall time when the engine dequeues them are discarded instead of
+    evaluated. A feed-gap tag (Tick.gap) on an evicted or stale tick is
+    handed to the next tick of that security the engine gets, so the resync
+    after a reconnect is not lost. Must be used from the event loop; the
+    feed thread calls reserve() before handing a tick over (see
+    core.feeds.handoff).
+    """
+
+    def __init__(self, maxsize: int, policy: str = DROP_OLDEST, max_age: float | None = None,
+                 block_timeout: float = 5.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_age = max_age
+        self.block_timeout = block_timeout
+
+        # entries are [update, alive]; evicted entries stay in _items until
+        # dequeued or compacted, so eviction is O(1)
+        self._items = deque()
+        self._by_security = {}  # security_id -> deque of live entries (per-security policy)
+        self._gaps = {}         # security_id -> gap of a discarded tick, for its next dequeued tick
+        self._size = 0
+        self._not_empty = asyncio.Event()
+        self._slots = threading.BoundedSemaphore(maxsize) if policy == BLOCK else None
+        self._dropped = QUEUE_DROPPED.labels(policy)
+
+        # stats
+        self.received = 0
+        self.dropped = 0
+        self.stale = 0
+        self.max_depth = 0
+
+    # ────────────────────────────────
+    #  Producer side
+    # ────────────────────────────────
+
+    def reserve(self, loop) -> bool:
+        """
+        Feed-thread side: under the block policy wait for a free slot (the
+        thread blocks). Returns False if none freed up in time; the tick is
+        then counted as dropped and must not be handed over.
+        """
+        if self._slots is None or self._slots.acquire(timeout=self.block_timeout):
+            return True
+        loop.call_soon_threadsafe(self._drop_incoming)
+        return False
+
+    def put_nowait(self, update):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise asyncio.QueueFull
+        self._put(update)
+
+    def put_many(self, updates):
+        """Enqueue a batch handed over from the feed thread (slots already reserved)."""
+        for update in updates:
+            self._put(update)
+
+    def _put(self, update):
+        self.received += 1
+        if self._slots is None and self._size >= self.maxsize:
+            self._evict(update.security_id)
+
+        entry = [update, True]
+        self._items.append(entry)
+        if self.policy == DROP_OLDEST_PER_SECURITY:
+            self._by_security.setdefault(update.security_id, deque()).append(entry)
+        self._size += 1
+        if self._size > self.max_depth:
+            self.max_depth = self._size
+        self._not_empty.set()
+
+    def _evict(self, security_id):
+        entry = None
+        if self.policy == DROP_OLDEST_PER_SECURITY:
+            same = self._by_security.get(security_id)
+            if same:
+                entry = same.popleft()
+                if not same:
+                    del self._by_security[security_id]
+        if entry is None:
+            while entry is None or not entry[1]:
+                entry = self._items.popleft()
+            self._forget(entry)
+        self._keep_gap(entry[0])
+        entry[1] = False
+        entry[0] = None
+        self._size -= 1
+        self.dropped += 1
+        self._dropped.inc()
+        if len(self._items) > 2 * self.maxsize:
+            self._items = deque(e for e in self._items if e[1])
+
+    def _drop_incoming(self):
+        self.received += 1
+        self.dropped += 1
+        self._dropped.inc()
+
+    # ────────────────────────────────
+    #  Consumer side
+    # ────────────────────────────────
+
+    def _pop(self):
+        entry = self._items.popleft()
+        while not entry[1]:
+            entry = self._items.popleft()
+        self._forget(entry)
+        self._size -= 1
+        if self._slots is not None:
+            self._slots.release()
+        update = entry[0]
+        if self._gaps:
+            gap = self._gaps.pop(update.security_id, None)
+            if gap is not None and (update.gap is None or update.gap < gap):
+                update.gap = gap
+        return update
+
+    def _keep_gap(self, update):
+        """Hold a discarded tick's gap tag for the next tick of its security."""
+        gap = update.gap
+        if gap is not None:
+            key = update.security_id
+            held = self._gaps.get(key)
+            if held is None or held < gap:
+                self._gaps[key] = gap
+
+    def _forget(self, entry):
+        if self.policy == DROP_OLDEST_PER_SECURITY:
+            key = entry[0].security_id
+            same = self._by_security[key]
+            same.popleft()  # FIFO per security: the popped entry is its oldest
+            if not same:
+                del self._by_security[key]
+
+    def _is_stale(self, update, now):
+        if self.max_age is None:
+            return False
+        if now - update.ltt > self.max_age:
+            self.stale += 1
+            QUEUE_STALE.inc()
+            self._keep_gap(update)
+            return True
+        return False
+
+    async def get(self):
+        while True:
+            while not self._size:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            update = self._pop()
+            if not self._is_stale(update, time.time()):
+                return update
+
+    async def get_batch(self) -> list:
+        """Wait for ticks and return all pending (fresh) ones in arrival order."""
+        while True:
+            while not self._size:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            now = time.time()
+            batch = []
+            while self._size:
+                update = self._pop()
+                if not self._is_stale(update, now):
+                    batch.append(update)
+            if batch:
+                return batch
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def stats(self):
+        return {
+            "depth": self._size,
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "received": self.received,
+            "dropped": self.dropped,
+            "stale": self.stale,
+        }
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+
+class ConflatingQueue:
+    """
+    Drop-in replacement for the FeedManager price queue that conflates ticks.
+
+    Pending ticks are keyed by security_id: a newer tick replaces the pending
+    one for the same security (latest price wins) while keeping the position
+    of its first arrival, so a slow consumer only ever sees one stale tick per
+    security instead of the whole backlog. A feed-gap tag (Tick.gap) on a
+    replaced tick moves to its replacement, so the engine still resyncs.
+    Must be used from the event loop (the feed thread hands ticks over in
+    batches, see core.feeds.handoff).
+    """
+
+    def __init__(self):
+        self._pending = {}  # security_id -> (update, first_enqueued_at)
+        self._not_empty = asyncio.Event()
+
+        # stats
+        self.received = 0
+        self.conflated = 0      # ticks overwritten before the engine saw them
+        self.max_depth = 0
+        self.max_lag = 0.0      # longest time a security waited in the queue (s)
+
+    def put_nowait(self, update):
+        self.put_many((update,))
+
+    def put_many(self, updates):
+        """Enqueue a batch handed over from the feed thread."""
+        pending_map = self._pending
+        now = time.monotonic()
+        for update in updates:
+            self.received += 1
+            key = update.security_id
+            pending = pending_map.get(key)
+            if pending is not None:
+                self.conflated += 1
+                gap = pending[0].gap
+                if gap is not None and (update.gap is None or update.gap < gap):
+                    update.gap = gap
+                pending_map[key] = (update, pending[1])
+            else:
+                pending_map[key] = (update, now)
+        if len(pending_map) > self.max_depth:
+            self.max_depth = len(pending_map)
+        self._not_empty.set()
+
+    async def get_batch(self) -> list:
+        """Wait for ticks and return all pending ones, in order of first arrival."""
+        while not self._pending:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        pending, self._pending = self._pending, {}
+        now = time.monotonic()
+        batch = []
+        for update, enqueued_at in pending.values():
+            lag = now - enqueued_at
+            if lag > self.max_lag:
+                self.max_lag = lag
+            batch.append(update)
+        return batch
+
+    async def get(self):
+        """Single-tick get, for consumers that do not drain in batches."""
+        while not self._pending:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        key = next(iter(self._pending))
+        update, enqueued_at = self._pending.pop(key)
+        lag = time.monotonic() - enqueued_at
+        if lag > self.max_lag:
+            self.max_lag = lag
+        return update
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def empty(self) -> bool:
+        return not self._pending
+
+    def stats(self):
+        return {
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "conflated": self.conflated,
+            "max_lag": round(self.max_lag, 4),
+        }
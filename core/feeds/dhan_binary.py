@@ -0,0 +1,237 @@
+import asyncio
+import json
+import struct
+import time
+
+import websockets
+
+from core.feeds.feed_connection import FeedConnection, FEED_TICKS
+from core.ticks import IST_OFFSET, Tick
+from core.log import get_logger, sample, DEBUG
+
+log = get_logger("feed")
+TICK_LOG_INTERVAL = 5.0  # seconds between DEBUG tick logs per security
+
+FEED_URL = "wss://api-feed.dhan.co?version=2&token={token}&clientId={client_id}&authType=2"
+
+# request codes (JSON, client -> server)
+SUBSCRIBE_TICKER = 15
+UNSUBSCRIBE_TICKER = 16
+# response codes (binary, server -> client)
+TICKER_PACKET = 2
+PREV_CLOSE_PACKET = 6
+DISCONNECT_PACKET = 50
+
+NSE_EQ = "NSE_EQ"
+SEGMENT_CODES = {"IDX_I": 0, "NSE_EQ": 1, "NSE_FNO": 2, "NSE_CURRENCY": 3, "BSE_EQ": 4, "MCX_COMM": 5,
+                 "BSE_CURRENCY": 7, "BSE_FNO": 8}
+
+# little-endian, as the feed sends it
+HEADER = struct.Struct("<BHBI")   # response code, message length, exchange segment, security id
+TICKER = struct.Struct("<fI")     # LTP, LTT (IST wall-clock seconds since the epoch)
+PREV_CLOSE = struct.Struct("<fI")  # previous close, previous open interest
+DISCONNECT_REASON = struct.Struct("<H")
+PACKET_SIZES = {
+    TICKER_PACKET: HEADER.size + TICKER.size,
+    PREV_CLOSE_PACKET: HEADER.size + PREV_CLOSE.size,
+    DISCONNECT_PACKET: HEADER.size + DISCONNECT_REASON.size,
+}
+
+
+def subscription_messages(code: int, sec_ids, batch_size: int, segment: str = NSE_EQ):
+    """JSON (un)subscribe requests for `sec_ids`, at most `batch_size` instruments each."""
+    ids = sorted(sec_ids)
+    for i in range(0, len(ids), batch_size):
+        chunk = ids[i:i + batch_size]
+        yield json.dumps({
+            "RequestCode": code,
+            "InstrumentCount": len(chunk),
+            "InstrumentList": [{"ExchangeSegment": segment, "SecurityId": str(sec_id)} for sec_id in chunk],
+        })
+
+
+def ticker_packet(security_id, ltp: float, ltt: float, segment: int = SEGMENT_CODES[NSE_EQ]) -> bytes:
+    """Encode a ticker packet (used by the mock server); `ltt` in epoch seconds."""
+    return HEADER.pack(TICKER_PACKET, PACKET_SIZES[TICKER_PACKET], segment, int(security_id)) + \
+        TICKER.pack(ltp, int(ltt) + IST_OFFSET)
+
+
+def disconnect_packet(reason: int) -> bytes:
+    return HEADER.pack(DISCONNECT_PACKET, PACKET_SIZES[DISCONNECT_PACKET], 0, 0) + DISCONNECT_REASON.pack(reason)
+
+
+class DhanBinaryConnection(FeedConnection):
+    """
+    Dhan v2 market feed client running on the main event loop: the native
+    alternative to FeedConnection's SDK thread (FeedManager backend="native").
+
+    Frames are decoded in place with struct.unpack_from over a memoryview
+    (no per-packet dicts), and each frame's ticks go straight into the
+    price queue with one put_many, with no thread hop. Subscriptions are the
+    JSON requests the SDK sends, chunked by the manager's batch_size, and
+    the current set is subscribed again whenever the socket (re)connects;
+    as with the SDK connection, first ticks after a drop carry Tick.gap.
+    """
+
+    def __init__(self, index: int, manager, url: str | None = None):
+        super().__init__(index, manager)
+        self.url = url or FEED_URL.format(token=manager.access_token, client_id=manager.client_id)
+        self.frames = 0
+        self._task = None
+        self._ws = None
+        self._outbox = None
+        self._ids = {}  # int security id -> str, so the hot path does not format ints
+
+    # ────────────────────────────────
+    #  Lifecycle
+    # ────────────────────────────────
+
+    def start(self):
+        self._stopped = False
+        self.started_at = self.last_tick_time = time.time()
+        self._task = self.manager._main_loop.create_task(self._run())
+
+    def stop(self):
+        self._stopped = True
+        if self._task:
+            self._task.cancel()
+
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        retry_delay = 1
+        while not self._stopped:
+            connected = False
+            try:
+                async with websockets.connect(self.url, max_size=None) as ws:
+                    self._outbox = asyncio.Queue()
+                    self._ws = ws
+                    connected = True
+                    replay = 0
+                    for message in subscription_messages(SUBSCRIBE_TICKER, self.subscribed, self.manager.batch_size):
+                        await ws.send(message)
+                        replay += 1
+                    log.info("Native feed %d connected (%d instruments replayed in %d messages).",
+                             self.index, len(self.subscribed), replay)
+                    writer = asyncio.create_task(self._write(ws))
+                    retry_delay = 1
+                    try:
+                        async for frame in ws:
+                            if isinstance(frame, bytes):
+                                self._on_frame(frame)
+                    finally:
+                        writer.cancel()
+                        self._ws = None
+                log.warning("Native feed %d closed by the server.", self.index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                log.error("Native feed %d error: %s. Retrying in %ss", self.index, e, retry_delay)
+            if connected:
+                # mark the drop once: failed attempts until the next connection
+                # keep its start time, so the reconnect is timed from the drop
+                self.expect_gap(self.subscribed)
+            if not self._stopped:
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay*2, 60) # exponential back off
+        log.info("Native feed %d exiting.", self.index)
+
+    async def _write(self, ws):
+        outbox = self._outbox
+        while True:
+            await ws.send(await outbox.get())
+
+    # ────────────────────────────────
+    #  Decoding (hot path)
+    # ────────────────────────────────
+
+    def _on_frame(self, frame: bytes):
+        manager = self.manager
+        journal = manager.journal
+        watched = manager.watchlist_mgr.has
+        ids = self._ids
+        last_ltt = self.last_ltt
+        gap_from = self._gap_from
+        unpack_header = HEADER.unpack_from
+        unpack_ticker = TICKER.unpack_from
+        debug = log.isEnabledFor(DEBUG)
+
+        view = memoryview(frame)
+        size = len(view)
+        received_at = time.time()
+        ticks = []
+        received = 0
+        offset = 0
+        disconnect = None
+        while offset + HEADER.size <= size:
+            code, length, _segment, security_id = unpack_header(view, offset)
+            if code == TICKER_PACKET:
+                ltp, ltt = unpack_ticker(view, offset + HEADER.size)
+                received += 1
+                sec_id = ids.get(security_id)
+                if sec_id is None:
+                    sec_id = ids[security_id] = str(security_id)
+                # LTP is a float32 (the SDK rounds it to paise too); LTT is IST wall-clock
+                ltp = round(ltp, 2)
+                ltt -= IST_OFFSET
+                last_ltt[sec_id] = ltt
+                if journal is not None:
+                    journal.record(sec_id, ltp, ltt, received_at)
+                if watched(sec_id):
+                    tick = Tick(sec_id, ltp, ltt, received_at)
+                    if gap_from:
+                        tick.gap = self._end_gap(sec_id, ltt)
+                    ticks.append(tick)
+                    if debug and sample(("tick", sec_id), TICK_LOG_INTERVAL):
+                        log.debug("Mapped tick %s", tick)
+            elif code == DISCONNECT_PACKET:
+                disconnect = DISCONNECT_REASON.unpack_from(view, offset + HEADER.size)[0]
+                break
+            offset += PACKET_SIZES.get(code) or length or size
+
+        self.frames += 1
+        if received and self._reconnect_started is not None:
+            self._first_tick_after_reconnect(received_at)
+        if received:
+            self.ticks += received
+            self.last_tick_time = received_at
+            self._ticks_metric.inc(received)
+        if ticks:
+            FEED_TICKS.inc(len(ticks))
+            manager.deliver(ticks)
+        if disconnect is not None:
+            # after delivering: ticks decoded before it are already journaled
+            raise ConnectionError(f"server disconnected the feed (reason {disconnect})")
+
+    # ────────────────────────────────
+    #  Subscriptions
+    # ────────────────────────────────
+
+    def _queue(self, code, sec_ids) -> int:
+        if self._ws is None or not sec_ids:
+            return 0  # sent with the full set on (re)connect
+        sent = 0
+        for message in subscription_messages(code, sec_ids, self.manager.batch_size):
+            self._outbox.put_nowait(message)
+            sent += 1
+        return sent
+
+    def subscribe(self, sec_ids) -> int:
+        self.subscribed |= sec_ids
+        sent = self._queue(SUBSCRIBE_TICKER, sec_ids)
+        log.debug("✅ Subscribed %s on native feed %d", sorted(sec_ids), self.index)
+        return sent
+
+    def unsubscribe(self, sec_ids) -> int:
+        self.subscribed -= sec_ids
+        for sec_id in sec_ids:
+            self.last_ltt.pop(sec_id, None)
+            self._gap_from.pop(sec_id, None)
+        sent = self._queue(UNSUBSCRIBE_TICKER, sec_ids)
+        log.debug("❌ Unsubscribed %s on native feed %d", sorted(sec_ids), self.index)
+        return sent
+
+    def stats(self, now: float = None):
+        return {**super().stats(now), "backend": "native", "frames": self.frames}
@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from dhanhq import DhanContext, MarketFeed
+from core.feeds.bounded_queue import BoundedPriceQueue
+from core.ticks import Tick, ltt_to_epoch
+from core import metrics
+from core.log import get_logger, sample, DEBUG
+
+log = get_logger("feed")
+TICK_LOG_INTERVAL = 5.0  # seconds between DEBUG tick logs per security
+
+FEED_TICKS = metrics.counter("feed_ticks_total", "Ticks received from the broker feed and forwarded")
+CONNECTION_TICKS = metrics.counter("feed_connection_ticks_total", "Ticks received per feed connection",
+                                   ["connection"])
+CONNECTION_SUBSCRIPTIONS = metrics.gauge("feed_connection_subscriptions", "Instruments placed on a feed connection",
+                                         ["connection"])
+CONNECTION_UP = metrics.gauge("feed_connection_up", "1 while the feed connection thread is running",
+                              ["connection"])
+RECONNECT_FIRST_TICK = metrics.histogram("feed_reconnect_first_tick_seconds",
+                                         "Time from starting a reconnect to the first tick on that connection",
+                                         buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+
+class FeedConnection:
+    """
+    One MarketFeed websocket running in its own thread.
+
+    Ticks are forwarded to the owning FeedManager's price queue; the manager
+    decides which securities live on which connection. Tick counts and the
+    last tick time are kept per connection for health checks and stats.
+
+    A reconnect is warm: the new MarketFeed is subscribed to the whole set
+    again (in batches), and each security's first tick afterwards carries
+    the LTT gap since its last tick before the drop (Tick.gap), so the
+    engine can re-evaluate it against that fresh price.
+    """
+
+    def __init__(self, index: int, manager):
+        self.index = index
+        self.manager = manager
+        self.subscribed = set()  # security ids placed on this connection
+        self.last_ltt = {}       # security id -> LTT of its latest tick (feed thread)
+        self._gap_from = {}      # security id -> LTT before a drop, until its first tick after it
+        self._reconnect_started = None
+        self.last_reconnect_seconds = None
+
+        self._thread = None
+        self._feed = None
+        self._stopped = False
+
+        # stats (ticks / last_tick_time are written by the feed thread)
+        self.ticks = 0
+        self.errors = 0
+        self.restarts = 0
+        self.started_at = time.time()
+        self.last_tick_time = time.time()
+        self.tick_rate = 0.0
+        self._rate_ticks = 0
+        self._rate_at = time.time()
+
+        label = str(index)
+        self._ticks_metric = CONNECTION_TICKS.labels(label)
+        CONNECTION_SUBSCRIPTIONS.set_function(lambda: len(self.subscribed), label)
+        CONNECTION_UP.set_function(lambda: int(self.alive()), label)
+
+    # ────────────────────────────────
+    #  Lifecycle
+    # ────────────────────────────────
+
+    def start(self):
+        self._stopped = False
+        self.started_at = self.last_tick_time = time.time()
+        self._thread = threading.Thread(target=self._thread_run, name=f"feed-{self.index}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        if self._feed:
+            self._feed.disconnect()
+
+    def restart(self):
+        log.warning("Restarting feed connection %d…", self.index)
+        self.restarts += 1
+        try:
+            self.stop()
+            if self._thread and self._thread.is_alive():
+                log.info("Waiting for old feed thread %d to stop…", self.index)
+                self._thread.join(timeout=5)
+        except Exception as e:
+            log.error("Error while stopping feed thread %d: %s", self.index, e)
+        self.expect_gap(self.subscribed)
+        self.start()
+
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def expect_gap(self, sec_ids, last_ltt: dict | None = None, reconnect: bool = True):
+        """
+        Mark the feed as dropped for `sec_ids`: their next tick on this
+        connection is tagged with the gap since `last_ltt` (default: this
+        connection's own record; the drop time if a security never ticked).
+        With `reconnect`, the time to this connection's first tick is measured.
+        """
+        last_ltt = self.last_ltt if last_ltt is None else last_ltt
+        dropped_at = time.time()
+        for sec_id in list(sec_ids):
+            self._gap_from[sec_id] = last_ltt.get(sec_id, dropped_at)
+        if reconnect:
+            self._reconnect_started = dropped_at
+
+    def _first_tick_after_reconnect(self, received_at: float):
+        took = received_at - self._reconnect_started
+        self._reconnect_started = None
+        self.last_reconnect_seconds = took
+        RECONNECT_FIRST_TICK.observe(took)
+        log.info("Connection %d: first tick %.2fs after reconnecting", self.index, took)
+
+    def _end_gap(self, sec_id, ltt: float):
+        """Gap for a security's first tick after a drop, or None if it was not waiting for one."""
+        last = self._gap_from.pop(sec_id, None)
+        return None if last is None else max(0.0, ltt - last)
+
+    def healthy(self, now: float, stale_after: float) -> bool:
+        """Running, and ticking if it carries any subscriptions."""
+        if not self.alive():
+            return False
+        return not self.subscribed or now - self.last_tick_time <= stale_after
+
+    # ────────────────────────────────
+    #  Thread: websocket loop
+    # ────────────────────────────────
+
+    def _thread_run(self):
+        # Dhan requires a local event loop for its websocket
+        thread_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(thread_loop)
+
+        manager = self.manager
+        handoff = manager.handoff
+        price_queue = manager.price_queue
+        # under the "block" overflow policy this may block the feed thread
+        reserve = price_queue.reserve if isinstance(price_queue, BoundedPriceQueue) else None
+        ctx = DhanContext(manager.client_id, manager.access_token)
+        # Start empty and subscribe dynamically; after a restart the current
+        # set is replayed here in batches, later diffs come from the manager
+        self._feed = MarketFeed(ctx, [], version="v2")
+        replay = 0
+        for chunk in self._chunks(set(self.subscribed)):
+            self._feed.subscribe_symbols(chunk)
+            replay += len(chunk)
+        gap_from = self._gap_from
+
+        log.info("Feed thread %d connected (dynamic mode, %d instruments replayed).", self.index, replay)
+        retry_delay = 5
+        while not self._stopped:
+            try:
+                self._feed.run_forever()
+                msg = self._feed.get_data()
+                if not msg:
+                    continue
+
+                sec_id = str(msg.get("security_id"))
+                ltp = msg.get("LTP")
+                received_at = time.time()
+                ltt = ltt_to_epoch(msg.get("LTT"), received_at)
+                self.ticks += 1
+                self.last_tick_time = received_at
+                self.last_ltt[sec_id] = ltt
+                self._ticks_metric.inc()
+                if self._reconnect_started is not None:
+                    self._first_tick_after_reconnect(received_at)
+                if manager.journal is not None and ltp is not None:
+                    manager.journal.record(sec_id, ltp, ltt, received_at)
+                # Forward only if still watched
+                if not manager.watchlist_mgr.has(sec_id):
+                    continue
+
+                if sec_id and ltp is not None:
+                    tick = Tick(sec_id, float(ltp), ltt, received_at)
+                    if gap_from:
+                        tick.gap = self._end_gap(sec_id, ltt)
+                    FEED_TICKS.inc()
+                    if log.isEnabledFor(DEBUG) and sample(("tick", sec_id), TICK_LOG_INTERVAL):
+                        log.debug("Mapped tick %s", tick)
+                    if reserve is None or reserve(manager._main_loop):
+                        handoff.put(tick)
+                    elif tick.gap is not None:
+                        # queue full (block policy): the next tick of sec_id resyncs instead
+                        gap_from[sec_id] = ltt - tick.gap
+                retry_delay = 5
+            except Exception as e:
+                self.errors += 1
+                # the SDK reconnects with its instrument list; ticks in between are
+                # missed. Mark the drop once, so the reconnect is timed from it
+                if self._reconnect_started is None:
+                    self.expect_gap(self.subscribed)
+                log.error("Feed thread %d error: %s. Retrying in %ss", self.index, e, retry_delay)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay*2, 60) # exponential back off
+
+        log.info("Feed thread %d exiting.", self.index)
+
+    # ────────────────────────────────
+    #  Subscriptions
+    # ────────────────────────────────
+
+    def _chunks(self, sec_ids):
+        batch_size = self.manager.batch_size
+        instruments = [(MarketFeed.NSE, sec_id, MarketFeed.Ticker) for sec_id in sorted(sec_ids)]
+        for i in range(0, len(instruments), batch_size):
+            yield instruments[i:i + batch_size]
+
+    def subscribe(self, sec_ids) -> int:
+        """Place ids on this connection and subscribe them in chunks; returns messages sent."""
+        self.subscribed |= sec_ids
+        if not self._feed or not sec_ids:
+            return 0
+        sent = 0
+        for chunk in self._chunks(sec_ids):
+            self._feed.subscribe_symbols(chunk)
+            sent += 1
+        log.debug("✅ Subscribed %s on connection %d", sorted(sec_ids), self.index)
+        return sent
+
+    def unsubscribe(self, sec_ids) -> int:
+        """Remove ids from this connection, unsubscribing in chunks; returns messages sent."""
+        self.subscribed -= sec_ids
+        for sec_id in sec_ids:
+            self.last_ltt.pop(sec_id, None)
+            self._gap_from.pop(sec_id, None)
+        if not self._feed or not sec_ids:
+            return 0
+        sent = 0
+        for chunk in self._chunks(sec_ids):
+            self._feed.unsubscribe_symbols(chunk)
+            sent += 1
+        log.debug("❌ Unsubscribed %s on connection %d", sorted(sec_ids), self.index)
+        return sent
+
+    def stats(self, now: float = None):
+        """Per-connection health; also advances the tick rate measured since the last call."""
+        now = now or time.time()
+        elapsed = now - self._rate_at
+        if elapsed > 0:
+            self.tick_rate = (self.ticks - self._rate_ticks) / elapsed
+            self._rate_ticks, self._rate_at = self.ticks, now
+        return {
+            "connection": self.index,
+            "alive": self.alive(),
+            "subscriptions": len(self.subscribed),
+            "ticks": self.ticks,
+            "tick_rate": round(self.tick_rate, 1),
+            "last_tick_ago": round(now - self.last_tick_time, 1),
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "last_reconnect_first_tick": self.last_reconnect_seconds,
+            "awaiting_resync": len(self._gap_from),
+        }
@@ -1,40 +1,119 @@
 import asyncio
-import threading
 import time
-from dhanhq import DhanContext, MarketFeed
+from core.feeds.conflating_queue import ConflatingQueue
+from core.feeds.bounded_queue import BoundedPriceQueue, DROP_OLDEST, BLOCK
+from core.feeds.feed_connection import FeedConnection
+from core.feeds.dhan_binary import DhanBinaryConnection
+from core.feeds.handoff import TickHandoff
+from core import metrics
+from core.log import get_logger
+
+log = get_logger("feed")
+BACKENDS = ("sdk", "native")     # MarketFeed thread per connection, or the asyncio client in dhan_binary
+SUBSCRIBE_BATCH = 100            # Dhan accepts at most 100 instruments per (un)subscribe message
+MAX_PER_CONNECTION = 5000        # ...and at most 5000 instruments per websocket connection
+STALE_CONNECTION_AFTER = 60      # seconds without a tick before a connection is considered dropped
+
+FEED_SUBSCRIPTIONS = metrics.gauge("feed_subscriptions", "Instruments currently subscribed")
+FEED_UNPLACED = metrics.gauge("feed_unplaced_instruments", "Watched instruments no connection has room for")
+FEED_RECONNECTS = metrics.counter("feed_reconnects_total", "Feed restarts triggered by the heartbeat")
+FEED_SUB_MESSAGES = metrics.counter("feed_subscription_messages_total", "(Un)subscribe messages sent to the broker",
+                                    ["op"])
+FEED_SYNC_SECONDS = metrics.histogram("feed_sync_seconds",
+                                      "Time from the first watchlist change to subscriptions converging")
 
 class FeedManager:
     """
     FeedManager that subscribes dynamically to symbols
     based on WatchlistManager updates.
+
+    Subscriptions are spread over a pool of `connections` websockets (each
+    capped at `max_per_connection` instruments); every connection feeds the
+    same price queue. A security stays on the connection it was placed on
+    until it is unwatched or that connection drops, in which case its
+    securities move to connections with room before it is restarted.
+
+    backend="sdk" runs each connection as a dhanhq MarketFeed thread;
+    backend="native" decodes the binary feed on this event loop instead
+    (see DhanBinaryConnection; `feed_url` points it at a mock server).
     """
 
-    def __init__(self, client_id, access_token, instruments, watchlist_mgr):
+    def __init__(self, client_id, access_token, instruments, watchlist_mgr, conflate=False, journal=None,
+                 queue_maxsize=0, overflow=DROP_OLDEST, max_tick_age=None,
+                 debounce_min=0.1, debounce_max=2.0, batch_size=SUBSCRIBE_BATCH,
+                 connections=1, max_per_connection=MAX_PER_CONNECTION, handoff_delay=0.0,
+                 backend="sdk", feed_url=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown feed backend {backend!r}, expected one of {BACKENDS}")
+        if backend == "native" and queue_maxsize and overflow == BLOCK:
+            raise ValueError("The block overflow policy needs a feed thread to block; "
+                             "use drop_oldest with the native backend")
         self.client_id = client_id
         self.access_token = access_token
         self.instruments = instruments  # initial instrument universe (NSE EQ, IDX)
         self.watchlist_mgr = watchlist_mgr
 
-        self.price_queue = asyncio.Queue()
-        self._thread = None
-        self._feed = None
+        # conflate=True keeps only the latest pending tick per security when
+        # the engine falls behind (see ConflatingQueue); queue_maxsize bounds
+        # the queue with an overflow policy (see BoundedPriceQueue)
+        if conflate:
+            self.price_queue = ConflatingQueue()
+        elif queue_maxsize:
+            self.price_queue = BoundedPriceQueue(queue_maxsize, overflow, max_tick_age)
+        else:
+            self.price_queue = asyncio.Queue()
+        # optional data.tick_journal.TickJournal recording every tick received
+        self.journal = journal
+        # watchlist changes are coalesced until `debounce_min` passes without
+        # another one (capped at `debounce_max`), then sent as one diff
+        self.debounce_min = debounce_min
+        self.debounce_max = debounce_max
+        self.batch_size = batch_size
+        self.max_per_connection = max_per_connection
+        # ticks reach the loop in batches (see TickHandoff); a small delay
+        # trades that much latency for fewer loop wake-ups
+        self.handoff_delay = handoff_delay
+        self.handoff = None
+        self.deliver = None  # price_queue.put_many, set on start()
+        self.backend = backend
+        if backend == "native":
+            self.connections = [DhanBinaryConnection(i, self, feed_url) for i in range(max(1, connections))]
+        else:
+            self.connections = [FeedConnection(i, self) for i in range(max(1, connections))]
         self._stopped = False
         self._main_loop = None
 
         # Track live subscriptions
         self.subscribed_ids = set()
-        self.last_tick_time = time.time()
+        self.placement = {}  # security_id -> FeedConnection
+        self.unplaced = set()  # watched, but every connection is full
+        FEED_SUBSCRIPTIONS.set_function(lambda: len(self.subscribed_ids))
+        FEED_UNPLACED.set_function(lambda: len(self.unplaced))
+
+    @property
+    def last_tick_time(self) -> float:
+        return max(conn.last_tick_time for conn in self.connections)
+
     # ────────────────────────────────
     #  Public lifecycle methods
     # ────────────────────────────────
 
     def start(self):
-        print("[FeedManager] Starting…")
+        log.info("Starting %d %s feed connection(s)…", len(self.connections), self.backend)
         self._main_loop = asyncio.get_running_loop()
+        put_many = getattr(self.price_queue, "put_many", None)
+        if put_many is None:
+            put_nowait = self.price_queue.put_nowait
+
+            def put_many(ticks):
+                for tick in ticks:
+                    put_nowait(tick)
+        self.deliver = put_many
+        self.handoff = TickHandoff(self._main_loop, put_many, self.handoff_delay)
 
-        # Start websocket feed in background thread
-        self._thread = threading.Thread(target=self._thread_run, daemon=True)
-        self._thread.start()
+        # Start websocket feeds (SDK: background threads, native: loop tasks)
+        for conn in self.connections:
+            conn.start()
 
         # Immediately sync with current watchlist once
         self._main_loop.create_task(self._initial_sync())
@@ -43,88 +122,35 @@ class FeedManager:
         # Start async watchlist monitor for future changes
         self._main_loop.create_task(self._monitor_watchlist_changes())
 
-        print("[FeedManager] Started.")
+        log.info("Started.")
 
 
     def stop(self):
-        print("[FeedManager] Stopping…")
+        log.info("Stopping…")
         self._stopped = True
-        if self._feed:
-            self._feed.disconnect()
-        print("[FeedManager] Stopped.")
-
-    
-    # ────────────────────────────────
-    #  Thread: websocket loop
-    # ────────────────────────────────
-
-    def _thread_run(self):
-        # Dhan requires a local event loop for its websocket
-        thread_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(thread_loop)
-
-        ctx = DhanContext(self.client_id, self.access_token)
-        # Start empty: we'll dynamically subscribe later
-        self._feed = MarketFeed(ctx, [], version="v2")
-
-        print("[FeedManager] Feed thread connected (dynamic mode).")
-        retry_delay = 5
-        while not self._stopped:
-            try:
-                self._feed.run_forever()
-                msg = self._feed.get_data()
-                if not msg:
-                    continue
-
-                sec_id = str(msg.get("security_id"))
-                ltp = msg.get("LTP")
-                ltt = msg.get("LTT")
-                # print('[FeedManager] Raw', msg)
-                # Forward only if still watched
-                if not self.watchlist_mgr.has(sec_id):
-                    continue
-
-                if sec_id and ltp is not None:
-                    update = {"security_id": sec_id, "price": float(ltp), "LTT": ltt}
-                    print('[FeedManager] Mapped Tick', update)
-                    self._main_loop.call_soon_threadsafe(
-                        self.price_queue.put_nowait, update
-                    )
-                retry_delay = 5
-            except Exception as e:
-                print(f"[FeedManager] Feed thread error: {e}. Retrying in {retry_delay}s")
-                time.sleep(retry_delay)
-                retry_delay = min(retry_delay*2, 60) # exponential back off
-
-        print("[FeedManager] Feed thread exiting.")
-    
-    def _restart_feed(self):
-        print("[FeedManager] Restarting feed thread...")
-        try:
-            self._stopped = True
-            if self._feed:
-                self._feed.disconnect()
-
-            if self._thread and self._thread.is_alive():
-                print("[FeedManager] Waiting for old feed thread to stop…")
-                self._thread.join(timeout=5)
-        except Exception as e:
-            print("[FeedManager] Error while stopping old thread:", e)
-
-        # reset state and start again
-        self._stopped = False
-        self._thread = threading.Thread(target=self._thread_run, daemon=True)
-        self._thread.start()
+        for conn in self.connections:
+            conn.stop()
+        log.info("Stopped.")
 
     async def _heartbeat(self):
         while not self._stopped:
             await asyncio.sleep(30)
-            delta = time.time() - self.last_tick_time
-            if delta > 60:
-                print(f"⚠️ [FeedManager] No tick for {int(delta)}s — reconnecting...")
-                self._restart_feed()
-            else:
-                print(f"✅ [FeedManager] Alive ({len(self.subscribed_ids)} subs, last tick {int(delta)}s ago)")
+            now = time.time()
+            for conn in self.connections:
+                if conn.healthy(now, STALE_CONNECTION_AFTER):
+                    continue
+                log.warning("⚠️ Connection %d: no tick for %ds — reconnecting...", conn.index,
+                            now - conn.last_tick_time)
+                FEED_RECONNECTS.inc()
+                self._evacuate(conn)
+                conn.restart()
+            log.info("✅ Alive (%d subs, last tick %ds ago)", len(self.subscribed_ids), now - self.last_tick_time)
+            if len(self.connections) > 1 or self.unplaced:
+                log.info("Connections: %s, unplaced: %d", [c.stats(now) for c in self.connections],
+                         len(self.unplaced))
+            log.info("Handoff stats: %s", self.handoff.stats())
+            if isinstance(self.price_queue, (ConflatingQueue, BoundedPriceQueue)):
+                log.info("Queue stats: %s", self.price_queue.stats())
 
     # ────────────────────────────────
     #  Subscription sync logic
@@ -132,43 +158,112 @@ class FeedManager:
     async def _initial_sync(self):
         """Sync current watchlist immediately on startup."""
         await asyncio.sleep(1)  # small delay to let thread connect
+        started = time.perf_counter()
         desired_ids = self.watchlist_mgr.get_all_security_ids()
-        for sec_id in desired_ids:
-            self._subscribe_id(sec_id)
-        self.subscribed_ids = desired_ids.copy()
-        print(f"[FeedManager] Initial sync complete. Subscribed {len(desired_ids)} instruments.")
+        _, _, messages = self._apply(desired_ids)
+        log.info("Initial sync complete. Subscribed %d instruments in %d messages (%.0f ms).",
+                 len(self.subscribed_ids), messages, (time.perf_counter() - started) * 1000)
 
     async def _monitor_watchlist_changes(self):
         """Monitors watchlist for updates and syncs subscriptions."""
-        print("[FeedManager] Watching for watchlist updates…")
+        log.info("Watching for watchlist updates…")
         while not self._stopped:
             await self.watchlist_mgr.on_change.wait()
-            self.watchlist_mgr.on_change.clear()
-            await asyncio.sleep(0.5)  # debounce multiple DB events
+            started = time.perf_counter()
+            events = await self._debounce()
 
-            desired_ids = self.watchlist_mgr.get_all_security_ids()
-            to_sub = desired_ids - self.subscribed_ids
-            to_unsub = self.subscribed_ids - desired_ids
+            added, removed, messages = self._apply(self.watchlist_mgr.get_all_security_ids())
+            elapsed = time.perf_counter() - started
+            FEED_SYNC_SECONDS.observe(elapsed)
+            log.info("Sync complete in %.0f ms: %d change event(s), +%d / -%d in %d messages. Active subs: %d",
+                     elapsed * 1000, events, added, removed, messages, len(self.subscribed_ids))
+            log.debug("Subscribed ids: %s", self.subscribed_ids)
 
-            for sec_id in to_sub:
-                self._subscribe_id(sec_id)
-            for sec_id in to_unsub:
-                self._unsubscribe_id(sec_id)
+    async def _debounce(self) -> int:
+        """
+        Wait until the watchlist has been quiet for `debounce_min` seconds
+        (or `debounce_max` passed since the first change); returns the number
+        of change events coalesced. A single edit syncs almost immediately,
+        a bulk import is sent as one diff.
+        """
+        on_change = self.watchlist_mgr.on_change
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.debounce_max
+        events = 0
+        while True:
+            on_change.clear()
+            events += 1
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return events
+            try:
+                await asyncio.wait_for(on_change.wait(), min(self.debounce_min, remaining))
+            except asyncio.TimeoutError:
+                return events
 
-            self.subscribed_ids = desired_ids.copy()
-            print(f"[FeedManager] Sync complete. Active subs: {len(self.subscribed_ids)}")
-            print(f'[FeedManager]', self.watchlist_mgr.get_all_security_ids())
+    def _apply(self, desired_ids):
+        """Bring the pool's subscriptions to `desired_ids`; returns (added, removed, messages)."""
+        removed = {}
+        for sec_id in self.subscribed_ids - desired_ids:
+            conn = self.placement.pop(sec_id)
+            removed.setdefault(conn, set()).add(sec_id)
+        self.unplaced &= desired_ids
 
-    def _subscribe_id(self, sec_id):
-        """Send subscription to Dhan feed if connected."""
-        if not self._feed:
-            return
-        self._feed.subscribe_symbols([(MarketFeed.NSE, sec_id, MarketFeed.Ticker)])
-        print(f"✅ Subscribed {sec_id}")
+        added = self._place(desired_ids - self.subscribed_ids)
+        if self.unplaced:
+            log.warning("%d instruments exceed the capacity of %d connection(s) × %d",
+                        len(self.unplaced), len(self.connections), self.max_per_connection)
+        messages = self._send(added, removed)
+        self.subscribed_ids = set(self.placement)
+        return sum(map(len, added.values())), sum(map(len, removed.values())), messages
 
-    def _unsubscribe_id(self, sec_id):
-        """Send unsubscription to Dhan feed."""
-        if not self._feed:
+    def _place(self, sec_ids, exclude=None) -> dict:
+        """Assign ids to the least-loaded connections with room; returns {conn: ids}."""
+        placed = {}
+        candidates = [c for c in self.connections if c is not exclude]
+        for sec_id in sorted(sec_ids):
+            conn = min(candidates, key=lambda c: len(c.subscribed) + len(placed.get(c, ())))
+            if len(conn.subscribed) + len(placed.get(conn, ())) >= self.max_per_connection:
+                self.unplaced.add(sec_id)
+                continue
+            self.unplaced.discard(sec_id)
+            self.placement[sec_id] = conn
+            placed.setdefault(conn, set()).add(sec_id)
+        return placed
+
+    def _send(self, added: dict, removed: dict) -> int:
+        unsubscribed = sum(conn.unsubscribe(ids) for conn, ids in removed.items())
+        subscribed = sum(conn.subscribe(ids) for conn, ids in added.items())
+        FEED_SUB_MESSAGES.labels("unsubscribe").inc(unsubscribed)
+        FEED_SUB_MESSAGES.labels("subscribe").inc(subscribed)
+        return unsubscribed + subscribed
+
+    def _evacuate(self, conn):
+        """Move a dropped connection's securities to the other connections (as room allows)."""
+        if len(self.connections) < 2 or not conn.subscribed:
             return
-        self._feed.unsubscribe_symbols([(MarketFeed.NSE, sec_id, MarketFeed.Ticker)])
-        print(f"❌ Unsubscribed {sec_id}")
+        moving = set(conn.subscribed)
+        conn.subscribed.clear()  # the connection is restarted empty
+        for sec_id in moving:
+            del self.placement[sec_id]
+        added = self._place(moving | self.unplaced, exclude=conn)
+        for target, ids in added.items():
+            # ticks missed while `conn` was silent: resync on the new connection's first tick
+            target.expect_gap(ids & moving, conn.last_ltt, reconnect=False)
+        self._send(added, {})
+        # whatever found no room elsewhere stays on the restarted connection
+        stay = moving - set(self.placement)
+        self.unplaced -= stay
+        for sec_id in stay:
+            self.placement[sec_id] = conn
+        conn.subscribed |= stay
+        self.subscribed_ids = set(self.placement)
+        log.info("Moved %d instruments off connection %d", len(moving) - len(stay), conn.index)
+
+    def stats(self):
+        now = time.time()
+        return {
+            "subscriptions": len(self.subscribed_ids),
+            "unplaced": len(self.unplaced),
+            "connections": [conn.stats(now) for conn in self.connections],
+        }
@@ -0,0 +1,67 @@
+import threading
+
+from core import metrics
+
+HANDOFF_BATCHES = metrics.counter("feed_handoff_batches_total", "Tick batches handed from feed threads to the loop")
+HANDOFF_TICKS = metrics.counter("feed_handoff_ticks_total", "Ticks handed from feed threads to the loop")
+
+
+class TickHandoff:
+    """
+    Double-buffered hand-over of ticks from feed threads to the event loop.
+
+    Feed threads append to the pending buffer; only the first tick of a
+    batch wakes the loop (one call_soon_threadsafe, i.e. one self-pipe
+    write). The loop swaps the buffer out `delay` seconds later and passes
+    the whole batch to `deliver` (the price queue's put_many), so at peak
+    rates the loop wakes at most once per batch instead of once per tick.
+    """
+
+    def __init__(self, loop, deliver, delay: float = 0.0):
+        self._loop = loop
+        self._deliver = deliver
+        self.delay = delay
+        self._lock = threading.Lock()  # only contended while the buffers are swapped
+        self._pending = []
+        self._scheduled = False
+
+        # stats
+        self.batches = 0
+        self.ticks = 0
+        self.max_batch = 0
+
+    def put(self, tick):
+        """Feed-thread side."""
+        with self._lock:
+            self._pending.append(tick)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if self.delay > 0:
+            self._loop.call_later(self.delay, self._drain)
+        else:
+            self._drain()
+
+    def _drain(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+        n = len(batch)
+        self.batches += 1
+        self.ticks += n
+        if n > self.max_batch:
+            self.max_batch = n
+        HANDOFF_BATCHES.inc()
+        HANDOFF_TICKS.inc(n)
+        self._deliver(batch)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "ticks": self.ticks,
+            "avg_batch": round(self.ticks / self.batches, 1) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+        }
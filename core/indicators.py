@@ -0,0 +1,203 @@
+# core/indicators.py
+from collections import deque
+
+from core.ticks import ist_day_start
+
+
+class EMA:
+    """Exponential moving average, seeded with the SMA of the first `period` inputs."""
+
+    __slots__ = ("period", "alpha", "value", "_count", "_seed")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+        self._count = 0
+        self._seed = 0.0
+
+    def update(self, price: float, t: float = None, volume: float = None):
+        if self._count < self.period:
+            self._count += 1
+            self._seed += price
+            if self._count == self.period:
+                self.value = self._seed / self.period
+            return
+        self.value += self.alpha * (price - self.value)
+
+
+class SMA:
+    """Simple moving average over the last `period` inputs (running sum)."""
+
+    __slots__ = ("period", "value", "_window", "_sum")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.value = None
+        self._window = deque()
+        self._sum = 0.0
+
+    def update(self, price: float, t: float = None, volume: float = None):
+        self._window.append(price)
+        self._sum += price
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        if len(self._window) == self.period:
+            self.value = self._sum / self.period
+
+
+class RSI:
+    """Wilder's RSI: simple average of the first `period` changes, then smoothed."""
+
+    __slots__ = ("period", "value", "_prev", "_count", "_gain", "_loss")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = None
+        self._prev = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def update(self, price: float, t: float = None, volume: float = None):
+        prev, self._prev = self._prev, price
+        if prev is None:
+            return
+        change = price - prev
+        gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+        n = self.period
+        if self._count < n:
+            self._count += 1
+            self._gain += gain / n
+            self._loss += loss / n
+            if self._count < n:
+                return
+        else:
+            self._gain = (self._gain * (n - 1) + gain) / n
+            self._loss = (self._loss * (n - 1) + loss) / n
+        self.value = 100.0 if self._loss == 0 else 100 - 100 / (1 + self._gain / self._loss)
+
+
+class VWAP:
+    """
+    Session VWAP, reset at each IST midnight. Ticks without a volume (the
+    Ticker feed carries none) count with weight 1, i.e. a tick-weighted
+    average price.
+    """
+
+    __slots__ = ("period", "value", "_day", "_pv", "_v")
+
+    def __init__(self, period=None):
+        self.period = period
+        self.value = None
+        self._day = None
+        self._pv = 0.0
+        self._v = 0.0
+
+    def update(self, price: float, t: float = None, volume: float = None):
+        if t is not None:
+            day = ist_day_start(t)
+            if day != self._day:
+                self._day, self._pv, self._v = day, 0.0, 0.0
+        weight = volume if volume else 1.0
+        self._pv += price * weight
+        self._v += weight
+        self.value = self._pv / self._v
+
+
+INDICATORS = {"ema": EMA, "sma": SMA, "rsi": RSI, "vwap": VWAP}
+
+
+def indicator_key(name: str, period: int | None = None, timeframe: str | None = None) -> tuple:
+    """Identity of an indicator on a security: ("ema", 20, "5m"); timeframe None = every tick."""
+    name = name.lower()
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator {name!r}, expected one of {list(INDICATORS)}")
+    return (name, None if name == "vwap" else int(period), timeframe)
+
+
+class IndicatorService:
+    """
+    Streaming indicators per security, shared by every rule that reads them.
+
+    An indicator exists only while some rule needs it: `require` creates it
+    (and counts references), `release` drops it with the last reference.
+    Tick indicators are fed by the engine on every tick of their security,
+    timeframe indicators on that timeframe's bar close; each update is O(1).
+    """
+
+    def __init__(self):
+        self._ticks = {}     # sec_id -> {key: indicator} for timeframe None
+        self._bars = {}      # sec_id -> {timeframe: {key: indicator}}
+        self._refs = {}      # (sec_id, key) -> reference count
+        self._versions = {}  # sec_id -> updates applied, for per-tick memoization
+
+    def require(self, sec_id, key: tuple):
+        sec_id = str(sec_id)
+        ref = (sec_id, key)
+        if ref in self._refs:
+            self._refs[ref] += 1
+            return
+        self._refs[ref] = 1
+        name, period, timeframe = key
+        indicator = INDICATORS[name](period)
+        if timeframe is None:
+            self._ticks.setdefault(sec_id, {})[key] = indicator
+        else:
+            self._bars.setdefault(sec_id, {}).setdefault(timeframe, {})[key] = indicator
+
+    def release(self, sec_id, key: tuple):
+        sec_id = str(sec_id)
+        ref = (sec_id, key)
+        count = self._refs.get(ref)
+        if count is None:
+            return
+        if count > 1:
+            self._refs[ref] = count - 1
+            return
+        del self._refs[ref]
+        timeframe = key[2]
+        if timeframe is None:
+            owner, parent, parent_key = self._ticks.get(sec_id, {}), self._ticks, sec_id
+        else:
+            owner, parent, parent_key = self._bars[sec_id][timeframe], self._bars[sec_id], timeframe
+        owner.pop(key, None)
+        if not owner:
+            parent.pop(parent_key, None)
+            if timeframe is not None and not self._bars[sec_id]:
+                del self._bars[sec_id]
+
+    def on_tick(self, sec_id, price: float, t: float, volume: float = None):
+        indicators = self._ticks.get(sec_id)
+        if indicators is None:
+            return
+        for indicator in indicators.values():
+            indicator.update(price, t, volume)
+        self._versions[sec_id] = self._versions.get(sec_id, 0) + 1
+
+    def on_bar(self, sec_id, timeframe: str, bar):
+        indicators = self._bars.get(sec_id, {}).get(timeframe)
+        if indicators is None:
+            return
+        for indicator in indicators.values():
+            indicator.update(bar.close, bar.start)
+        self._versions[sec_id] = self._versions.get(sec_id, 0) + 1
+
+    def has_bar_indicators(self, sec_id) -> bool:
+        return sec_id in self._bars
+
+    def value(self, sec_id, key: tuple):
+        """Current value, or None while the indicator is warming up (or not required)."""
+        timeframe = key[2]
+        if timeframe is None:
+            indicator = self._ticks.get(sec_id, {}).get(key)
+        else:
+            indicator = self._bars.get(sec_id, {}).get(timeframe, {}).get(key)
+        return indicator.value if indicator is not None else None
+
+    def version(self, sec_id) -> int:
+        return self._versions.get(sec_id, 0)
+
+    def stats(self):
+        return {"indicators": len(self._refs),
+                "securities": len(set(self._ticks) | set(self._bars))}
@@ -0,0 +1,95 @@
+# core/log.py
+"""
+Leveled, non-blocking logging for the bot.
+
+Loggers are per component (`get_logger("feed")`, `get_logger("engine")`)
+under one "alertbot" root. A log call only builds a LogRecord and puts it
+on a queue; a QueueListener thread formats it and writes to stdout, so the
+tick path never waits on the terminal.
+
+Levels come from configure(), e.g. from the environment:
+
+    LOG_LEVEL=INFO LOG_LEVELS=feed=DEBUG,engine=WARNING
+
+Per-tick messages are DEBUG and additionally rate limited per key with
+sample(), so at the default INFO level they cost one cached level check.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+ROOT = "alertbot"
+DEBUG, INFO, WARNING, ERROR = logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR
+
+_listener = None
+_next_allowed = {}  # sample key -> monotonic time the key may log again
+
+
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # QueueHandler.prepare() formats the message in the calling thread; hand
+    # the record over as-is and let the listener thread do the formatting.
+    # Records with mutable args (dicts, sets, Ticks...) are formatted here
+    # instead, so the message shows them as they were at the log call.
+    def prepare(self, record):
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(type(arg) in _IMMUTABLE_ARGS for arg in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+
+def get_logger(component: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{component}")
+
+
+def parse_levels(spec: str | None) -> dict:
+    """"feed=DEBUG,engine=WARNING" -> {"feed": "DEBUG", "engine": "WARNING"}"""
+    levels = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        component, level = part.split("=", 1)
+        levels[component.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level: str = "INFO", levels: dict | None = None, stream=None):
+    """Set the default and per-component levels and start the writer thread (once)."""
+    global _listener
+    root = logging.getLogger(ROOT)
+    root.setLevel(level.upper())
+    root.propagate = False
+    for component, component_level in (levels or {}).items():
+        get_logger(component).setLevel(component_level)
+
+    if _listener is None:
+        records = queue.SimpleQueue()
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        root.handlers[:] = [_DeferredQueueHandler(records)]
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+
+
+def shutdown():
+    """Drain pending records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def sample(key, seconds: float) -> bool:
+    """True at most once per `seconds` for each key, e.g. ("tick", sec_id)."""
+    now = time.monotonic()
+    if now < _next_allowed.get(key, 0.0):
+        return False
+    _next_allowed[key] = now + seconds
+    return True
@@ -14,6 +14,9 @@ class Watch:
     segment: str = "EQUITY"  # "EQUITY" | "INDEX" | "FNO"
     instrument_token: str | None = None
     window_minutes: int | None = None
+    upper_threshold: float | None = None  # WITHIN_RANGE: band is [threshold, upper_threshold]
+    expression: str | None = None  # EXPR rules, see rules/expression.py
+    timeframe: str | None = None   # "1m" | "5m" | "15m": evaluate on bar close only
     cooldown_minutes: int = 5
     last_triggered_at: Optional[datetime] = None
     last_triggered_state: bool = False  # optional new field for rule-specific cooldown
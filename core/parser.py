@@ -1,15 +1,25 @@
 from .models import Watch
 from rules.factory import RULE_REGISTRY  # dynamically loads all registered rules
+from rules.expression import parse_expression
+from core.candles import TIMEFRAMES
 
 def parse_watch_command(user_id: int, text: str, next_id: int) -> Watch:
     """
     Parse Telegram command of the form:
-        /watch SYMBOL RULE PRICE [EXTRA_ARGS...]
+        /watch SYMBOL RULE PRICE [EXTRA_ARGS...] [TIMEFRAME]
+
+    A trailing timeframe (1m, 5m, 15m) makes the watch evaluate on that
+    bar's close instead of every tick.
 
     Examples:
         /watch AAPL above 100
         /watch TSLA below 200
         /watch BTC percent_move 3 10
+        /watch TCS crosses_above 4000
+        /watch TCS within_range 3900 4000
+        /watch TCS above 4000 5m
+        /watch INFY expr price > 1500 and pct_move(15m) > 2
+        /watch INFY expr price > ema(20, 5m) and rsi(14) < 70
     """
 
     parts = text.strip().split()
@@ -22,12 +32,32 @@ def parse_watch_command(user_id: int, text: str, next_id: int) -> Watch:
     if cmd.lower() != "/watch":
         raise ValueError("Command must start with /watch")
 
+    timeframe = None
+    if args and args[-1].lower() in TIMEFRAMES:
+        timeframe = args.pop().lower()
+
     rule_name = rule_name.upper()
     allowed_rules = tuple(RULE_REGISTRY.keys())
 
     if rule_name not in allowed_rules:
         raise ValueError(f"Unknown rule '{rule_name}'. Allowed: {', '.join(allowed_rules)}")
 
+    if rule_name == "EXPR":
+        # everything after the rule name is the expression; compile-check it now
+        expression = " ".join(args)
+        parse_expression(expression)  # ExpressionError is a ValueError
+        return Watch(
+            id=next_id,
+            user_id=user_id,
+            symbol=symbol.upper(),
+            rule=rule_name,
+            threshold=0.0,  # unused by EXPR rules
+            expression=expression,
+            timeframe=timeframe,
+            last_triggered_at=None,
+            last_triggered_state=False,
+        )
+
     # --- Parse numeric arguments ---
     try:
         numeric_args = list(map(float, args))
@@ -40,9 +70,15 @@ def parse_watch_command(user_id: int, text: str, next_id: int) -> Watch:
     # --- Rule-specific argument mapping ---
     extra = {}
 
-    if rule_name in ("ABOVE", "BELOW"):
+    if rule_name in ("ABOVE", "BELOW", "CROSSES_ABOVE", "CROSSES_BELOW"):
         threshold = numeric_args[0]
 
+    elif rule_name == "WITHIN_RANGE":
+        # Format: /watch TCS within_range 3900 4000
+        if len(numeric_args) < 2:
+            raise ValueError("Usage: /watch SYMBOL within_range LOW HIGH")
+        threshold, extra["upper_threshold"] = sorted(numeric_args[:2])
+
     elif rule_name == "PERCENT_MOVE":
         # Format: /watch BTC percent_move 3 10
         # → move >=3% within 10 minutes
@@ -63,6 +99,7 @@ def parse_watch_command(user_id: int, text: str, next_id: int) -> Watch:
         threshold=threshold,
         last_triggered_at=None,
         last_triggered_state=False,
+        timeframe=timeframe,
         **extra  # dynamically add optional fields like window_minutes
     )
 
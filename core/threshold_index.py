@@ -0,0 +1,210 @@
+# core/threshold_index.py
+from bisect import bisect_left, bisect_right
+
+
+# Each indexed watch contributes one or more boundary points. A boundary on
+# the LEFT side belongs to a predicate that flips when lo <= t < hi
+# (price > t, price <= t); one on the RIGHT side to a predicate that flips
+# when lo < t <= hi (price < t, price >= t), for a tick moving between lo and hi.
+LEFT, RIGHT = "left", "right"
+
+
+class ThresholdIndex:
+    """
+    Per-security index of threshold and range watches, kept as sorted
+    boundary arrays.
+
+    A tick from p0 to p1 can only flip the condition of watches with a
+    boundary between the two prices, so only those are handed to the engine
+    (O(log n + k)). ABOVE / CROSSES_ABOVE watches have one boundary on the
+    LEFT side, BELOW / CROSSES_BELOW one on the RIGHT, and WITHIN_RANGE
+    [low, high] two: low on the RIGHT (price >= low) and high on the LEFT
+    (price <= high), so a band is only visited when the price enters or
+    leaves it. Watches of other rule types are returned on every tick.
+
+    Watches with a `timeframe` are evaluated on bar closes only (see
+    core/candles.py) and are kept apart, per security and timeframe.
+
+    Watches that still need a look regardless of crossing (just inserted or
+    updated, or condition met but held back by cooldown) are kept in a
+    per-security pending set until the engine has evaluated them.
+    """
+
+    INDEXED_RULES = ("ABOVE", "BELOW", "CROSSES_ABOVE", "CROSSES_BELOW", "WITHIN_RANGE")
+
+    def __init__(self):
+        self._books = {}       # sec_id -> {side: ([boundaries], [watch ids])}
+        self._entries = {}     # watch_id -> (sec_id, ((side, boundary), ...)); None if not indexed
+        self._watches = {}     # watch_id -> watch dict (indexed watches only)
+        self._others = {}      # sec_id -> {watch_id: watch} for non-indexed rules
+        self._pending = {}     # sec_id -> set of watch ids to evaluate on next tick
+        self._last_price = {}  # sec_id -> price of the previous tick
+        self._bar_watches = {} # sec_id -> {timeframe: {watch_id: watch}}
+        self._bar_entries = {} # watch_id -> (sec_id, timeframe)
+
+    # ────────────────────────────────
+    #  Maintenance (driven by WatchlistManager)
+    # ────────────────────────────────
+
+    @classmethod
+    def boundaries(cls, watch: dict):
+        """The watch's (side, boundary) points, or None if it is not indexable."""
+        rule = str(watch.get("rule", "")).upper()
+        if rule not in cls.INDEXED_RULES:
+            return None
+        try:
+            threshold = float(watch.get("threshold"))
+            if rule == "WITHIN_RANGE":
+                low, high = sorted((threshold, float(watch.get("upper_threshold"))))
+                return ((RIGHT, low), (LEFT, high))
+        except (TypeError, ValueError):
+            return None
+        if rule in ("ABOVE", "CROSSES_ABOVE"):
+            return ((LEFT, threshold),)
+        return ((RIGHT, threshold),)
+
+    @classmethod
+    def is_indexed(cls, watch: dict) -> bool:
+        return cls.boundaries(watch) is not None
+
+    def build(self, watchlist: dict):
+        for state in (self._books, self._entries, self._watches, self._others,
+                      self._pending, self._last_price, self._bar_watches, self._bar_entries):
+            state.clear()
+        for watches in watchlist.values():
+            for w in watches:
+                self.add(w)
+
+    def add(self, watch: dict):
+        """Insert (or replace) a watch and schedule it for evaluation on the next tick."""
+        watch_id = watch["id"]
+        self.remove(watch_id)
+        sec_id = str(watch.get("security_id"))
+
+        timeframe = watch.get("timeframe")
+        if timeframe:
+            self._bar_watches.setdefault(sec_id, {}).setdefault(timeframe, {})[watch_id] = watch
+            self._bar_entries[watch_id] = (sec_id, timeframe)
+            return
+
+        points = self.boundaries(watch)
+        if points is None:
+            self._others.setdefault(sec_id, {})[watch_id] = watch
+            self._entries[watch_id] = (sec_id, None)
+            return
+
+        book = self._books.setdefault(sec_id, {})
+        for side, boundary in points:
+            values, ids = book.setdefault(side, ([], []))
+            pos = bisect_right(values, boundary)
+            values.insert(pos, boundary)
+            ids.insert(pos, watch_id)
+
+        self._entries[watch_id] = (sec_id, points)
+        self._watches[watch_id] = watch
+        self._pending.setdefault(sec_id, set()).add(watch_id)
+
+    def remove(self, watch_id):
+        bar_entry = self._bar_entries.pop(watch_id, None)
+        if bar_entry is not None:
+            sec_id, timeframe = bar_entry
+            by_timeframe = self._bar_watches[sec_id]
+            del by_timeframe[timeframe][watch_id]
+            if not by_timeframe[timeframe]:
+                del by_timeframe[timeframe]
+            if not by_timeframe:
+                del self._bar_watches[sec_id]
+            return
+
+        entry = self._entries.pop(watch_id, None)
+        if entry is None:
+            return
+
+        sec_id, points = entry
+        if points is None:
+            others = self._others[sec_id]
+            del others[watch_id]
+            if not others:
+                del self._others[sec_id]
+            return
+
+        self._watches.pop(watch_id, None)
+        self._pending.get(sec_id, set()).discard(watch_id)
+
+        book = self._books[sec_id]
+        for side, boundary in points:
+            values, ids = book[side]
+            i = bisect_left(values, boundary)
+            while ids[i] != watch_id:
+                i += 1
+            del values[i]
+            del ids[i]
+            if not ids:
+                del book[side]
+        if not book:
+            del self._books[sec_id]
+            self._pending.pop(sec_id, None)
+            self._last_price.pop(sec_id, None)
+
+    # ────────────────────────────────
+    #  Hot path (driven by the engine)
+    # ────────────────────────────────
+
+    def watches_to_evaluate(self, sec_id: str, price: float) -> list:
+        """Watches whose outcome may have changed on a tick to `price`."""
+        sec_id = str(sec_id)
+        result = list(self._others.get(sec_id, {}).values())
+
+        book = self._books.get(sec_id)
+        if not book:
+            return result
+
+        prev = self._last_price.get(sec_id)
+        self._last_price[sec_id] = price
+
+        if prev is None:
+            # first tick for this security: nothing to diff against
+            self._pending.pop(sec_id, None)
+            selected = set()
+            for _, ids in book.values():
+                selected.update(ids)  # a range appears on both sides
+            result.extend(self._watches[i] for i in selected)
+            return result
+
+        selected = self._pending.pop(sec_id, set())
+        lo, hi = (prev, price) if prev <= price else (price, prev)
+        if lo != hi:
+            left = book.get(LEFT)
+            if left:
+                # price > t / price <= t flips iff lo <= t < hi
+                values, ids = left
+                selected.update(ids[bisect_left(values, lo):bisect_left(values, hi)])
+            right = book.get(RIGHT)
+            if right:
+                # price < t / price >= t flips iff lo < t <= hi
+                values, ids = right
+                selected.update(ids[bisect_right(values, lo):bisect_right(values, hi)])
+
+        result.extend(self._watches[i] for i in selected)
+        return result
+
+    def bar_watches(self, sec_id, timeframe) -> list:
+        """Watches to evaluate when a `timeframe` bar of sec_id closes."""
+        return list(self._bar_watches.get(str(sec_id), {}).get(timeframe, {}).values())
+
+    def has_bar_watches(self, sec_id) -> bool:
+        return str(sec_id) in self._bar_watches
+
+    def keep_pending(self, sec_id, watch_id):
+        """Re-check an indexed watch on the next tick even if no threshold is crossed."""
+        entry = self._entries.get(watch_id)
+        if entry and entry[1] is not None:
+            self._pending.setdefault(str(sec_id), set()).add(watch_id)
+
+    def stats(self):
+        return {
+            "indexed": len(self._watches),
+            "pending": sum(len(p) for p in self._pending.values()),
+            "securities": len(self._books),
+            "bar_watches": len(self._bar_entries),
+        }
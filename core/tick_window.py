@@ -0,0 +1,98 @@
+# core/tick_window.py
+from bisect import bisect_left
+
+
+class _Series:
+    """Time-ordered (time, price) samples in two flat lists with a moving head."""
+
+    __slots__ = ("times", "prices", "head")
+
+    def __init__(self):
+        self.times = []
+        self.prices = []
+        self.head = 0
+
+    def append(self, t: float, price: float):
+        if self.times and t < self.times[-1]:
+            t = self.times[-1]  # keep the series sorted if a tick arrives out of order
+        self.times.append(t)
+        self.prices.append(price)
+
+    def evict_before(self, cutoff: float):
+        times, head = self.times, self.head
+        while head < len(times) and times[head] < cutoff:
+            head += 1
+        # compact once the dead prefix is at least half the buffer (amortized O(1))
+        if head and head * 2 >= len(times):
+            del self.times[:head]
+            del self.prices[:head]
+            head = 0
+        self.head = head
+
+
+class TickWindowService:
+    """
+    One price series per security shared by every time-window rule on it.
+
+    Each series keeps exactly as much history as the longest window any watch
+    on that security asked for (see `require` / `release`). Samples are
+    timestamped with the exchange LTT, so windows follow exchange time rather
+    than the time the tick happened to be processed. Lookups are O(log n).
+    """
+
+    def __init__(self):
+        self._series = {}   # sec_id -> _Series
+        self._windows = {}  # sec_id -> {window_seconds: number of rules using it}
+        self._horizon = {}  # sec_id -> largest requested window (s)
+
+    def require(self, sec_id, window_seconds: float):
+        sec_id = str(sec_id)
+        windows = self._windows.setdefault(sec_id, {})
+        windows[window_seconds] = windows.get(window_seconds, 0) + 1
+        self._horizon[sec_id] = max(windows)
+        self._series.setdefault(sec_id, _Series())
+
+    def release(self, sec_id, window_seconds: float):
+        sec_id = str(sec_id)
+        windows = self._windows.get(sec_id)
+        if not windows or window_seconds not in windows:
+            return
+        windows[window_seconds] -= 1
+        if not windows[window_seconds]:
+            del windows[window_seconds]
+        if windows:
+            self._horizon[sec_id] = max(windows)
+        else:
+            del self._windows[sec_id]
+            del self._horizon[sec_id]
+            del self._series[sec_id]
+
+    def record(self, sec_id, price: float, t: float):
+        """Add a tick; a no-op for securities no rule needs history for."""
+        series = self._series.get(sec_id)
+        if series is None:
+            return
+        series.append(t, price)
+        series.evict_before(series.times[-1] - self._horizon[sec_id])
+
+    def last_time(self, sec_id) -> float | None:
+        series = self._series.get(str(sec_id))
+        if series is None or series.head >= len(series.times):
+            return None
+        return series.times[-1]
+
+    def first_price_since(self, sec_id, since: float) -> float | None:
+        """Price of the oldest sample with time >= `since`."""
+        series = self._series.get(str(sec_id))
+        if series is None:
+            return None
+        i = bisect_left(series.times, since, series.head)
+        if i >= len(series.times):
+            return None
+        return series.prices[i]
+
+    def stats(self):
+        return {
+            "securities": len(self._series),
+            "samples": sum(len(s.times) - s.head for s in self._series.values()),
+        }
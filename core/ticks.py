@@ -0,0 +1,83 @@
+# core/ticks.py
+import time
+from datetime import datetime, timezone
+
+IST_OFFSET = 5 * 3600 + 30 * 60  # exchange time is IST (UTC+05:30)
+_DAY = 24 * 3600
+
+
+def ist_day_start(now: float | None = None) -> float:
+    """Epoch seconds of the most recent IST midnight."""
+    now = time.time() if now is None else now
+    return (now + IST_OFFSET) // _DAY * _DAY - IST_OFFSET
+
+
+def wall_clock(tick_time: float | None = None) -> float:
+    """Engine clock for live trading: cooldowns and trigger times use wall time."""
+    return time.time()
+
+
+class TickClock:
+    """
+    Engine clock for replay / backtests: "now" is the LTT of the tick being
+    evaluated, so cooldowns and trigger timestamps follow the recording.
+    """
+
+    def __init__(self):
+        self.now = None
+
+    def __call__(self, tick_time: float) -> float:
+        self.now = tick_time
+        return tick_time
+
+
+def ltt_to_epoch(ltt, now: float | None = None) -> float:
+    """
+    Convert a tick's LTT (last trade time) to epoch seconds.
+
+    The Dhan SDK reports LTT as an IST wall-clock "HH:MM:SS" string for the
+    current session; numbers are taken as epoch seconds and anything else as
+    an ISO timestamp (naive = UTC). Falls back to the current time if LTT is
+    missing or unreadable.
+    """
+    if ltt is None:
+        return time.time() if now is None else now
+    if isinstance(ltt, (int, float)):
+        return float(ltt)
+    if isinstance(ltt, datetime):
+        return (ltt if ltt.tzinfo else ltt.replace(tzinfo=timezone.utc)).timestamp()
+    try:
+        text = str(ltt)
+        if len(text) <= 8 and text.count(":") == 2:
+            h, m, s = text.split(":")
+            return ist_day_start(now) + int(h) * 3600 + int(m) * 60 + int(s)
+        ts = datetime.fromisoformat(text)
+        return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+    except ValueError:
+        return time.time() if now is None else now
+
+
+class Tick:
+    """
+    One price update on its way from the feed to the engine. `ltt` is epoch
+    seconds (converted once, in the feed thread); bar-close events from
+    core.candles reuse the record with `timeframe` and `bar` set. `gap` is
+    set on a security's first tick after a feed reconnect: seconds since
+    its last LTT before the drop.
+    """
+
+    __slots__ = ("security_id", "price", "ltt", "received_at", "timeframe", "bar", "gap")
+
+    def __init__(self, security_id: str, price: float, ltt: float, received_at: float | None = None,
+                 timeframe: str | None = None, bar=None, gap: float | None = None):
+        self.security_id = security_id
+        self.price = price
+        self.ltt = ltt
+        self.received_at = received_at
+        self.timeframe = timeframe
+        self.bar = bar
+        self.gap = gap
+
+    def __repr__(self):
+        extra = f", {self.timeframe} close" if self.timeframe else ""
+        return f"Tick({self.security_id}, {self.price}, ltt={self.ltt}{extra})"
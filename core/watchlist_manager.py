@@ -1,31 +1,68 @@
 import asyncio
+from datetime import datetime, timezone
 from supabase import create_client
 from realtime import AsyncRealtimeClient
+from rules.rule_cache import RuleCache
+from core.threshold_index import ThresholdIndex
+from core.tick_window import TickWindowService
+from core.indicators import IndicatorService
+from rules.cooldown import prepare_cooldown
+from core import metrics
+
+REALTIME_EVENTS = metrics.counter("watchlist_realtime_events_total", "Realtime watch events applied", ["type"])
+WATCHES = metrics.gauge("watchlist_watches", "Watches held in memory")
 
 
 
 class WatchlistManager:
-    def __init__(self, supabase_url: str, supabase_key: str, table: str = "watches"):
-        self.supabase = create_client(supabase_url, supabase_key)
+    def __init__(self, supabase_url: str | None, supabase_key: str | None, table: str = "watches"):
+        # Without a URL the manager runs offline (engine shards, benchmarks)
+        # and is filled with load_watches() / _handle_event() instead.
+        self.supabase = create_client(supabase_url, supabase_key) if supabase_url else None
         # convert to wss websocket URL
-        domain = supabase_url.replace("https://", "")
+        domain = (supabase_url or "").replace("https://", "")
         self.ws_url = f"wss://{domain}/realtime/v1/websocket"
         self.key = supabase_key
         self.table = table
 
         self.WATCHLIST = {}
+        self.tick_windows = TickWindowService()
+        # indicators are created / dropped by the rule cache as watches come and go
+        self.indicators = IndicatorService()
+        self.rule_cache = RuleCache(self.tick_windows, self.indicators)
+        self.threshold_index = ThresholdIndex()
+        # optional engine.vector_eval.VectorIndex, attached by the engine
+        self.vector_index = None
         self.on_change = asyncio.Event()
 
+        # trigger states applied by the engine that the realtime echo has not
+        # confirmed yet: watch_id -> (last_triggered_state, last_triggered_at)
+        self._local_state = {}
+
+        # called with the raw realtime payload after it has been applied
+        # (e.g. to forward changes to engine shards)
+        self.event_listeners = []
+
         self.realtime = None
         self.channel = None
 
     def load_all(self):
         resp = self.supabase.table(self.table).select("*").execute()
+        self.load_watches(resp.data)
+        print("[Watchlist] Loaded", len(resp.data), "watches")
+
+    def load_watches(self, watches):
+        """Replace the in-memory watchlist with the given watch rows."""
         self.WATCHLIST = {}
-        for w in resp.data:
+        for w in watches:
             sec_id = str(w["security_id"])
+            prepare_cooldown(w)
             self.WATCHLIST.setdefault(sec_id, []).append(w)
-        print("[Watchlist] Loaded", len(resp.data), "watches")
+        self.rule_cache.build(watches)
+        self.threshold_index.build(self.WATCHLIST)
+        WATCHES.set(len(watches))
+        if self.vector_index:
+            self.vector_index.invalidate()
 
     async def start_realtime(self):
         """Keeps the realtime listener connected forever."""
@@ -74,7 +111,11 @@ class WatchlistManager:
             if event == "INSERT" and record:
                 sec_id = str(record.get("security_id"))
                 if sec_id:
+                    prepare_cooldown(record)
                     self.WATCHLIST.setdefault(sec_id, []).append(record)
+                    self._cache_rule(record)
+                    self.threshold_index.add(record)
+                    self._invalidate_vector(sec_id)
                     print(f"➕ Insert {sec_id}")
                     print('[Watchlist] updated', self.get_all_security_ids())
 
@@ -84,7 +125,12 @@ class WatchlistManager:
                 if sec_id in self.WATCHLIST:
                     for i, w in enumerate(self.WATCHLIST[sec_id]):
                         if w["id"] == old_record.get("id"):
+                            self._reconcile_trigger_state(record)
+                            prepare_cooldown(record)
                             self.WATCHLIST[sec_id][i] = record
+                            self._cache_rule(record)
+                            self.threshold_index.add(record)
+                            self._invalidate_vector(sec_id)
                             print(f"✏️ Update {sec_id}")
                             print('[Watchlist] updated', self.get_all_security_ids())
                             break
@@ -108,6 +154,10 @@ class WatchlistManager:
                     ]
                     if not self.WATCHLIST[sec_id]:
                         del self.WATCHLIST[sec_id]
+                    self.rule_cache.remove(deleted_id)
+                    self.threshold_index.remove(deleted_id)
+                    self._local_state.pop(deleted_id, None)
+                    self._invalidate_vector(sec_id)
                     print(f"🗑 Delete watch id {deleted_id} under {sec_id}")
                 else:
                     print(f"⚠️ Could not find sec_id for deleted id={deleted_id}")
@@ -118,16 +168,96 @@ class WatchlistManager:
 
             print("[Watchlist] Current IDs:", list(self.WATCHLIST.keys()))
             self.on_change.set()
+            REALTIME_EVENTS.labels(str(event)).inc()
+            WATCHES.set(sum(len(ws) for ws in self.WATCHLIST.values()))
+
+            for listener in self.event_listeners:
+                listener(payload)
 
         except Exception as e:
             print("[Watchlist] ERROR in event handler:", e)
             import traceback; traceback.print_exc()
 
+    # ────────────────────────────────
+    #  Trigger state (engine hot path)
+    # ────────────────────────────────
+
+    def apply_trigger_state(self, watch: dict, active_state: bool, at: str):
+        """
+        Apply a trigger-state transition to the in-memory watch right away.
+        The engine is the source of truth for these fields; the database write
+        happens later and its realtime echo is reconciled by timestamp.
+        """
+        watch["last_triggered_state"] = bool(active_state)
+        watch["last_triggered_at"] = at
+        prepare_cooldown(watch)
+        self._local_state[watch["id"]] = (bool(active_state), at)
+
+    def revert_trigger(self, sec_id, watch_id, at):
+        """
+        Undo a trigger whose alert could not be dispatched: the watch goes back
+        to untriggered (last fired at `at`) and is looked at again next tick.
+        """
+        sec_id = str(sec_id)
+        for w in self.WATCHLIST.get(sec_id, ()):
+            if w["id"] == watch_id:
+                w["last_triggered_state"] = False
+                w["last_triggered_at"] = at
+                prepare_cooldown(w)
+                self._local_state.pop(watch_id, None)
+                self.threshold_index.keep_pending(sec_id, watch_id)
+                self._invalidate_vector(sec_id)
+                return
+
+    def _reconcile_trigger_state(self, record: dict):
+        """Keep the engine's newer trigger state if the incoming row predates it."""
+        local = self._local_state.get(record.get("id"))
+        if local is None:
+            return
+        local_state, local_at = local
+        incoming_at = record.get("last_triggered_at")
+        if incoming_at is None:
+            # explicit reset from the bot (e.g. /resume) wins
+            self._local_state.pop(record["id"], None)
+            return
+        if self._timestamp(incoming_at) >= self._timestamp(local_at):
+            # echo of our own write (or something newer) arrived
+            self._local_state.pop(record["id"], None)
+            return
+        record["last_triggered_state"] = local_state
+        record["last_triggered_at"] = local_at
+
+    @staticmethod
+    def _timestamp(value: str) -> float:
+        ts = datetime.fromisoformat(value)
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+
+    def _invalidate_vector(self, sec_id):
+        if self.vector_index:
+            self.vector_index.invalidate(sec_id)
+
+    def _cache_rule(self, record):
+        try:
+            self.rule_cache.upsert(record)
+        except Exception as e:
+            # keep the watch; the engine will report the bad rule when it evaluates it
+            print(f"[Watchlist] Could not compile rule for watch {record.get('id')}: {e}")
+
     def get_all_security_ids(self):
         return set(self.WATCHLIST.keys())
 
     def get_watches_for(self, sec_id):
         return self.WATCHLIST.get(str(sec_id), [])
 
+    def get_watches_to_evaluate(self, sec_id, price):
+        """Watches for sec_id whose outcome may change at this price (see ThresholdIndex)."""
+        return self.threshold_index.watches_to_evaluate(sec_id, price)
+
     def has(self, sec_id):
         return str(sec_id) in self.WATCHLIST
+
+    def needs_bars(self, sec_id):
+        """True if a bar-close watch or a timeframe indicator reads sec_id's bars."""
+        return self.threshold_index.has_bar_watches(sec_id) or self.indicators.has_bar_indicators(str(sec_id))
@@ -0,0 +1,13 @@
+-- Columns used by the newer watch rules. Run once in the Supabase SQL editor;
+-- data.storage.add_watch only sends them when they are set, so inserts keep
+-- working on a table that does not have them yet.
+
+-- WITHIN_RANGE: the band is [threshold, upper_threshold]
+alter table public.watches add column if not exists upper_threshold double precision;
+
+-- EXPR: rule expression, see rules/expression.py
+alter table public.watches add column if not exists expression text;
+
+-- evaluate on bar close only (core/candles.py TIMEFRAMES)
+alter table public.watches add column if not exists timeframe text
+    check (timeframe in ('1m', '5m', '15m'));
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from datetime import datetime
+from core import metrics
+from core.log import get_logger
+
+log = get_logger("state_store")
+
+DB_WRITE_SECONDS = metrics.histogram("state_store_flush_seconds", "Latency of one bulk trigger-state write")
+DB_ROWS_WRITTEN = metrics.counter("state_store_rows_written_total", "Trigger-state rows written to the database")
+DB_WRITE_FAILURES = metrics.counter("state_store_flush_failures_total", "Bulk trigger-state writes that failed")
+DB_ROWS_DROPPED = metrics.counter("state_store_rows_dropped_total",
+                                  "Trigger-state rows given up on, by reason", ["reason"])
+
+
+class WriteBehindStateStore:
+    """
+    Write-behind buffer for watch trigger state.
+
+    The engine calls `record()` instead of writing to Supabase directly. Only
+    the latest state per watch id is kept, and the buffer is flushed as a
+    single bulk write whenever it reaches `max_batch` watches or every
+    `flush_interval` seconds. The blocking write runs in a worker thread so
+    the event loop never waits on the network.
+
+    A failed write is retried on the next flush, up to `max_attempts` times
+    per watch; rows for watches that no longer exist are dropped.
+    """
+
+    def __init__(self, flush_func, max_batch: int = 200, flush_interval: float = 1.0, max_attempts: int = 5):
+        self.flush_func = flush_func  # sync callable taking a list of row dicts, returns the ids written
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+
+        self._pending = {}  # watch_id -> row
+        self._attempts = {}  # watch_id -> failed writes of its pending row
+        self._flush_now = None
+        self._task = None
+        self._stopping = False
+
+        # stats
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.missing = 0
+
+    def start(self):
+        self._flush_now = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def record(self, watch_id, active_state: bool, at: str | None = None):
+        """Buffer the latest trigger state for a watch. Never blocks."""
+        self._pending[watch_id] = {
+            "id": watch_id,
+            "last_triggered_at": at or datetime.utcnow().isoformat(timespec='microseconds'),
+            "last_triggered_state": bool(active_state),
+        }
+        self.recorded += 1
+        if len(self._pending) >= self.max_batch and self._flush_now:
+            self._flush_now.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        rows = list(batch.values())
+        started = time.perf_counter()
+        try:
+            written = await asyncio.to_thread(self.flush_func, rows)
+            self.flushes += 1
+            for watch_id in batch:
+                self._attempts.pop(watch_id, None)
+            written = len(rows) if written is None else len(set(written))
+            if written < len(rows):
+                # watches deleted since their state was recorded: nothing to write
+                self.missing += len(rows) - written
+                DB_ROWS_DROPPED.labels("missing").inc(len(rows) - written)
+            self.rows_written += written
+            DB_ROWS_WRITTEN.inc(written)
+        except Exception as e:
+            self.failures += 1
+            DB_WRITE_FAILURES.inc()
+            given_up = 0
+            for watch_id, row in batch.items():
+                attempts = self._attempts.get(watch_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(watch_id, None)
+                    given_up += 1
+                    continue
+                self._attempts[watch_id] = attempts
+                # put rows back unless a newer state was recorded meanwhile
+                self._pending.setdefault(watch_id, row)
+            self.dropped += given_up
+            DB_ROWS_DROPPED.labels("failed").inc(given_up)
+            log.error("Flush of %d rows failed, will retry (%d given up after %d attempts): %s",
+                      len(rows), given_up, self.max_attempts, e)
+        finally:
+            DB_WRITE_SECONDS.observe(time.perf_counter() - started)
+
+    async def stop(self):
+        """Stop the flush timer and write out whatever is still buffered."""
+        if self._task:
+            # let an in-flight flush finish instead of cancelling it mid-write
+            self._stopping = True
+            self._flush_now.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            log.warning("⚠️ %d watch states could not be written on shutdown.", len(self._pending))
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "missing": self.missing,
+        }
@@ -2,6 +2,8 @@ from datetime import datetime
 from .supabase_client import supabase
 from core.models import Watch
 
+OPTIONAL_COLUMNS = ("upper_threshold", "expression", "timeframe")
+
 def add_watch(watch: Watch):
     """Insert a new watch into the database."""
     data = {
@@ -18,6 +20,12 @@ def add_watch(watch: Watch):
         "last_triggered_at": watch.last_triggered_at,
         "last_triggered_state": watch.last_triggered_state,
     }
+    # newer columns (data/migrations/001_watch_rule_columns.sql) are only sent
+    # when set, so plain watches still insert into a table without them
+    for column in OPTIONAL_COLUMNS:
+        value = getattr(watch, column, None)
+        if value is not None:
+            data[column] = value
 
     result = supabase.table("watches").insert(data).execute()
     return result.data[0] if result.data else None
@@ -39,6 +47,27 @@ def update_last_triggered(watch_id, active_state):
     supabase.table("watches").update(payload).eq("id", watch_id).execute()
 
 
+def bulk_update_last_triggered(rows):
+    """
+    Write many trigger states with as few requests as possible.
+    Each row is {"id", "last_triggered_at", "last_triggered_state"}. Rows that
+    share a state and timestamp (one tick's worth) go out as one UPDATE ... WHERE
+    id IN (...); only those two columns are touched and ids of deleted watches
+    simply match nothing. Returns the ids that were updated.
+    """
+    groups = {}
+    for row in rows:
+        key = (row["last_triggered_at"], row["last_triggered_state"])
+        groups.setdefault(key, []).append(row["id"])
+
+    updated = []
+    for (at, state), ids in groups.items():
+        payload = {"last_triggered_at": at, "last_triggered_state": state}
+        result = supabase.table("watches").update(payload).in_("id", ids).execute()
+        updated.extend(r["id"] for r in result.data or ())
+    return updated
+
+
 def list_all_watches():
     """Return all watches for all users."""
     result = supabase.table("watches").select("*").execute()
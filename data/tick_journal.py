@@ -0,0 +1,248 @@
+# data/tick_journal.py
+"""
+Append-only journal of raw feed ticks.
+
+One segment file per IST trading day (ticks-YYYYMMDD.bin): a 16-byte header
+followed by fixed-size little-endian records
+
+    security_id  uint32
+    ltp          float64
+    ltt          float64   exchange time, epoch seconds
+    received_at  float64   wall time the feed thread saw the tick
+
+The feed thread only puts a tuple on a SimpleQueue; packing, LTT parsing and
+file I/O happen on the journal's writer thread. Readers mmap a segment and
+can iterate it or bisect by received_at (records are in arrival order).
+"""
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+from core.ticks import IST_OFFSET, ist_day_start, ltt_to_epoch
+from core.log import get_logger
+
+log = get_logger("journal")
+
+MAGIC = b"TICKJNL1"
+HEADER = struct.Struct("<8sII")  # magic, record size, reserved
+RECORD = struct.Struct("<Iddd")
+READ_CHUNK = 4096  # records copied out of the mmap at a time while iterating
+_STOP = object()
+
+
+def segment_name(epoch: float) -> str:
+    day = datetime.fromtimestamp(ist_day_start(epoch) + IST_OFFSET, timezone.utc)
+    return f"ticks-{day:%Y%m%d}.bin"
+
+
+def list_segments(directory: str) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith("ticks-") and name.endswith(".bin")
+    )
+
+
+class TickJournal:
+    """
+    Non-blocking tick recorder. `record()` is safe to call from the feed
+    thread; a daemon writer thread batches records into the current day's
+    segment and flushes at least every `flush_interval` seconds.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 1.0, batch_size: int = 4096):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._segment = None
+        self.written = 0
+        self.skipped = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="tick-journal", daemon=True)
+        self._thread.start()
+        log.info("Recording ticks to %s", self.directory)
+
+    def record(self, security_id, ltp, ltt, received_at):
+        # hot path: no formatting, no I/O
+        self._queue.put((security_id, ltp, ltt, received_at))
+
+    def stop(self, timeout: float = 10):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        log.info("Stopped. %d ticks written, %d skipped.", self.written, self.skipped)
+
+    def stats(self):
+        return {"written": self.written, "skipped": self.skipped, "backlog": self._queue.qsize(),
+                "segment": self._segment}
+
+    # ────────────────────────────────
+    #  Writer thread
+    # ────────────────────────────────
+
+    def _run(self):
+        buf = bytearray()
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            batch = []
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            for security_id, ltp, ltt, received_at in batch:
+                try:
+                    packed = RECORD.pack(int(security_id), float(ltp),
+                                         ltt_to_epoch(ltt, now=received_at), received_at)
+                except (TypeError, ValueError, struct.error):
+                    self.skipped += 1
+                    continue
+                name = segment_name(received_at)
+                if name != self._segment:
+                    self._write(buf)
+                    buf.clear()
+                    self._open_segment(name)
+                buf += packed
+                self.written += 1
+
+            if buf and (stopping or time.monotonic() - last_flush >= self.flush_interval
+                        or len(buf) >= self.batch_size * RECORD.size):
+                self._write(buf)
+                buf.clear()
+                self._file.flush()
+                last_flush = time.monotonic()
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, buf):
+        if buf and self._file:
+            self._file.write(buf)
+
+    def _open_segment(self, name):
+        if self._file:
+            self._file.close()
+        path = os.path.join(self.directory, name)
+        self._file = open(path, "ab")
+        size = self._file.tell()
+        if size == 0:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+        else:
+            # drop a partial trailing record left by a crash
+            extra = (size - HEADER.size) % RECORD.size
+            if extra:
+                self._file.truncate(size - extra)
+                self._file.seek(0, os.SEEK_END)
+        self._segment = name
+
+
+class TickJournalReader:
+    """
+    Memory-mapped view of one journal segment.
+
+        with TickJournalReader(path) as ticks:
+            for sec_id, ltp, ltt, received_at in ticks.between(start, end): ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path}: not a tick journal segment")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a tick journal segment")
+        self._count = (size - HEADER.size) // RECORD.size
+        self._view = memoryview(self._mmap)[HEADER.size:HEADER.size + self._count * RECORD.size]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._view, i * RECORD.size)
+
+    def __iter__(self):
+        return self._iter(0, self._count)
+
+    def received_at(self, i) -> float:
+        return struct.unpack_from("<d", self._view, i * RECORD.size + 20)[0]
+
+    def bisect(self, t: float) -> int:
+        """Index of the first record received at or after `t`."""
+        return bisect_left(_ReceivedAt(self), t)
+
+    def between(self, start: float | None = None, end: float | None = None):
+        """Iterate records with start <= received_at < end."""
+        lo = self.bisect(start) if start is not None else 0
+        hi = self.bisect(end) if end is not None else self._count
+        return self._iter(lo, hi)
+
+    def _iter(self, lo, hi):
+        # Copy READ_CHUNK records at a time instead of iterating a slice of the
+        # mmap: an unfinished iterator then holds no buffer export, so close()
+        # cannot fail with BufferError (iterating after close() raises TypeError).
+        size = RECORD.size
+        for first in range(lo, hi, READ_CHUNK):
+            chunk = self._view[first * size:min(hi, first + READ_CHUNK) * size].tobytes()
+            yield from RECORD.iter_unpack(chunk)
+
+    def close(self):
+        view = getattr(self, "_view", None)
+        if view is not None:
+            view.release()
+            self._view = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _ReceivedAt:
+    # sequence adapter so bisect can search the mmap without materialising it
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, i):
+        return self.reader.received_at(i)
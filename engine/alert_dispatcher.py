@@ -0,0 +1,115 @@
+import asyncio
+import time
+from core import metrics
+from core.log import get_logger, sample
+
+log = get_logger("dispatcher")
+DROP_LOG_INTERVAL = 5.0  # seconds between "queue full" warnings
+
+ALERTS_SENT = metrics.counter("dispatcher_alerts_sent_total", "Alerts delivered by sender workers")
+ALERTS_FAILED = metrics.counter("dispatcher_alerts_failed_total", "Alert sends that raised")
+ALERTS_DROPPED = metrics.counter("dispatcher_alerts_dropped_total", "Alerts dropped because the queue was full")
+SEND_SECONDS = metrics.histogram("dispatcher_send_seconds", "Alert send latency", ["worker"])
+DISPATCH_QUEUE_DEPTH = metrics.gauge("dispatcher_queue_depth", "Alerts waiting for a sender worker")
+
+
+class AlertDispatcher:
+    """
+    Delivers fired alerts off the evaluation path.
+
+    The engine only calls `enqueue()`; a fixed pool of sender workers drains
+    a bounded queue and awaits the actual send (Telegram by default). When
+    the queue is full the alert is dropped and counted instead of stalling
+    tick processing.
+    """
+
+    def __init__(self, send_func, workers: int = 4, maxsize: int = 1000, report_interval: float = 60):
+        self.send_func = send_func
+        self.num_workers = workers
+        self.report_interval = report_interval
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._workers = []
+
+        # stats
+        self.enqueued = 0
+        self.dropped = 0
+        self.failed = 0
+        self.worker_stats = [
+            {"sent": 0, "total_latency": 0.0, "max_latency": 0.0} for _ in range(workers)
+        ]
+        DISPATCH_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker(i)) for i in range(self.num_workers)]
+        if self.report_interval:
+            self._workers.append(loop.create_task(self._report()))
+        log.info("Started %d sender workers.", self.num_workers)
+
+    def enqueue(self, watch: dict, price: float, description: str) -> bool:
+        """Queue an alert for delivery. Never blocks; returns False if dropped."""
+        try:
+            self.queue.put_nowait((watch, price, description))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            ALERTS_DROPPED.inc()
+            if sample(("dispatcher", "dropped"), DROP_LOG_INTERVAL):
+                log.warning("⚠️ Queue full, dropped alert for watch %s (%d dropped so far)",
+                            watch.get("id"), self.dropped)
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, n: int):
+        stats = self.worker_stats[n]
+        latency_hist = SEND_SECONDS.labels(str(n))
+        while True:
+            watch, price, description = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await self.send_func(watch, price, description)
+                ALERTS_SENT.inc()
+            except Exception as e:
+                self.failed += 1
+                ALERTS_FAILED.inc()
+                log.error("Worker %d failed to send alert for watch %s: %s", n, watch.get("id"), e)
+            finally:
+                latency = time.perf_counter() - started
+                stats["sent"] += 1
+                stats["total_latency"] += latency
+                stats["max_latency"] = max(stats["max_latency"], latency)
+                latency_hist.observe(latency)
+                self.queue.task_done()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            log.info("Stats: %s", self.stats())
+
+    async def stop(self, timeout: float = 10):
+        """Wait (up to `timeout` seconds) for queued and in-flight sends, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ Shutdown timed out with %d alerts unsent.", self.queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        log.info("Stopped.")
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "workers": [
+                {
+                    "sent": s["sent"],
+                    "avg_latency": round(s["total_latency"] / s["sent"], 4) if s["sent"] else 0.0,
+                    "max_latency": round(s["max_latency"], 4),
+                }
+                for s in self.worker_stats
+            ],
+        }
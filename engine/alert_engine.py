@@ -32,38 +32,176 @@
 #                 print(f"Error evaluating rule {w}: {e}")
 
 import asyncio
-from rules.factory import create_rule_from_watch
+from datetime import datetime
+from time import perf_counter, time as wall_time
 from integrations.telegram_sender import send_alert
-from data.storage import update_last_triggered
-
-async def alert_engine(price_stream, wl_manager):
-    print("⚡ Alert engine started and waiting for updates...")
+from engine.alert_dispatcher import AlertDispatcher
+from data.state_store import WriteBehindStateStore
+from engine.vector_eval import VectorIndex
+from core.ticks import wall_clock
+from core import metrics
+from core.log import get_logger
+
+log = get_logger("engine")
+
+TICKS = metrics.counter("engine_ticks_total", "Ticks processed by the alert engine", ["security_id"])
+BARS = metrics.counter("engine_bars_total", "Bar-close events processed by the alert engine", ["timeframe"])
+QUEUE_DEPTH = metrics.gauge("engine_queue_depth", "Ticks waiting in the price queue")
+QUEUE_WAIT = metrics.histogram("engine_queue_wait_seconds", "Time from feed receipt to engine pickup")
+EVAL_SECONDS = metrics.histogram("engine_tick_eval_seconds", "Rule evaluation time per tick")
+ALERTS_FIRED = metrics.counter("engine_alerts_fired_total", "Alerts fired by rule evaluation")
+TICK_GAPS = metrics.histogram("engine_tick_gap_seconds", "LTT gap of securities resynced after a feed reconnect",
+                              buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600))
+
+
+def _set_trigger_state(w, active_state, wl_manager, state_store, now=None):
+    # in-memory first so the next tick already sees it, then persist behind
+    at = (now or datetime.utcnow()).isoformat(timespec='microseconds')
+    wl_manager.apply_trigger_state(w, active_state, at)
+    state_store.record(w["id"], active_state, at)
+
+
+def _evaluate_vectorized(book, price, wl_manager, dispatcher, state_store, now_epoch):
+    """NumPy path for a dense security: same outcome as should_trigger per watch."""
+    now = datetime.utcfromtimestamp(now_epoch)
+    fire, reset = book.evaluate(price, now_epoch)
+
+    for i in fire:
+        w = book.watches[i]
+        try:
+            rule = wl_manager.rule_cache.get(w)
+            if not dispatcher.enqueue(w, price, rule.describe(price)):
+                continue  # dispatcher full: stays untriggered, fires again next tick
+            ALERTS_FIRED.inc()
+            _set_trigger_state(w, True, wl_manager, state_store, now)
+            book.set_state(i, True, now_epoch)
+        except Exception as e:
+            log.error("Error evaluating rule %s: %s", w, e)
+
+    for i in reset:
+        w = book.watches[i]
+        _set_trigger_state(w, False, wl_manager, state_store, now)
+        book.set_state(i, False, now_epoch)
+
+
+def _process_tick(update, wl_manager, dispatcher, state_store, clock=wall_clock):
+    security_id = update.security_id
+    price = update.price
+    # LTT in epoch seconds, converted once by the feed thread (core.ticks.Tick)
+    tick_time = update.ltt
+
+    timeframe = update.timeframe
+    if timeframe:
+        # bar close from core.candles.CandleStage: only watches on that timeframe
+        now = clock(tick_time)
+        wl_manager.indicators.on_bar(security_id, timeframe, update.bar)
+        watches = wl_manager.threshold_index.bar_watches(security_id, timeframe)
+        if watches:
+            _evaluate_watches(watches, price, security_id, now, wl_manager, dispatcher, state_store,
+                              f" [{timeframe} close]")
+        return
+
+    # shared per-security history for PERCENT_MOVE rules, on exchange time
+    wl_manager.tick_windows.record(security_id, price, tick_time)
+    wl_manager.indicators.on_tick(security_id, price, tick_time)
+    # engine "now" for cooldowns and trigger timestamps (wall time live, LTT in replay)
+    now = clock(tick_time)
+
+    resync = update.gap is not None
+    if resync:
+        TICK_GAPS.observe(update.gap)
+        log.info("Resync %s at %s after a %.1fs feed gap", security_id, price, update.gap)
+
+    vector_index = wl_manager.vector_index
+    book = vector_index.book_for(security_id) if vector_index else None
+    if book is not None:
+        # dense security: evaluate all ABOVE/BELOW watches at once; the
+        # remaining rule types still go through the index, so only those
+        # whose threshold was crossed take the object path below
+        _evaluate_vectorized(book, price, wl_manager, dispatcher, state_store, now)
+        watches = [w for w in wl_manager.get_watches_to_evaluate(security_id, price)
+                   if w["id"] not in book.ids]
+    else:
+        # Instead of querying DB, fetch watches from in-memory watchlist.
+        # Only watches whose threshold was crossed since the last tick come back.
+        watches = wl_manager.get_watches_to_evaluate(security_id, price)
+    if resync:
+        # first tick after a feed reconnect: the price may have crossed and
+        # come back unseen, so every tick watch the book did not just
+        # evaluate is checked against the fresh price (the index, advanced
+        # above, only knows about crossings since the last tick it saw)
+        in_book = book.ids if book is not None else ()
+        watches = [w for w in wl_manager.get_watches_for(security_id)
+                   if not w.get("timeframe") and w["id"] not in in_book]
+    if not watches:
+        return  # nothing to evaluate for this security_id
+    _evaluate_watches(watches, price, security_id, now, wl_manager, dispatcher, state_store)
+
+
+def _evaluate_watches(watches, price, security_id, now, wl_manager, dispatcher, state_store, suffix=""):
+    # compiled rules and threshold index are kept in sync by WatchlistManager realtime events
+    rule_cache = wl_manager.rule_cache
+    for w in watches:
+        try:
+            rule = rule_cache.get(w)
+            if rule.should_trigger(price, w, now):
+                if not dispatcher.enqueue(w, price, rule.describe(price) + suffix):
+                    # dispatcher full: leave it untriggered and retry on the next tick
+                    wl_manager.threshold_index.keep_pending(security_id, w["id"])
+                    continue
+                ALERTS_FIRED.inc()
+                _set_trigger_state(w, True, wl_manager, state_store, datetime.utcfromtimestamp(now))
+            elif not rule.condition_met(price):
+                # Reset only when condition becomes false again
+                if w.get("last_triggered_state"):
+                    _set_trigger_state(w, False, wl_manager, state_store, datetime.utcfromtimestamp(now))
+            elif w.get("enabled", True) and not w.get("last_triggered_state"):
+                # condition met but still in cooldown: look again next tick
+                wl_manager.threshold_index.keep_pending(security_id, w["id"])
+
+        except Exception as e:
+            log.error("Error evaluating rule %s: %s", w, e)
+
+
+async def alert_engine(price_stream, wl_manager, dispatcher=None, state_store=None, vectorized=False,
+                       clock=wall_clock):
+    log.info("⚡ Alert engine started and waiting for updates...")
+    if vectorized:
+        wl_manager.vector_index = VectorIndex(wl_manager)
+    # Delivery happens on the dispatcher's workers and trigger state is written
+    # behind in bulk; evaluation itself never waits on the network.
+    if dispatcher is None:
+        dispatcher = AlertDispatcher(send_alert)
+        dispatcher.start()
+    if state_store is None:
+        from data.storage import bulk_update_last_triggered
+        state_store = WriteBehindStateStore(bulk_update_last_triggered)
+        state_store.start()
+
+    QUEUE_DEPTH.set_function(price_stream.qsize)
+
+    # A ConflatingQueue hands over everything pending at once; a plain
+    # asyncio.Queue is drained one tick at a time.
+    batched = hasattr(price_stream, "get_batch")
     while True:
-        print("Waiting for update from queue…")
-        update = await price_stream.get()
-        security_id = update.get("security_id")
-        price = update.get("price")
-        time = update.get("LTT")
-        # print(f"[QUEUE GET] security_id={security_id}, price={price}, time = {time}")
-        # Optionally time or additional data
-
-        # Instead of querying DB, fetch watches from in-memory watchlist
-        watches = wl_manager.get_watches_for(security_id)
-        if not watches:
-            continue  # no watch for this security_id
-
-        for w in watches:
-            try:
-                rule = create_rule_from_watch(w)
-                if rule.should_trigger(price, w):
-                    await send_alert(w, price, rule.describe(price))
-                    update_last_triggered(w["id"], True)
-                elif not rule.condition_met(price):
-                    # Reset only when condition becomes false again
-                    update_last_triggered(w["id"], False)
-
-            except Exception as e:
-                print(f"Error evaluating rule {w}: {e}")
+        if batched:
+            updates = await price_stream.get_batch()
+        else:
+            updates = (await price_stream.get(),)
+
+        for update in updates:
+            received_at = update.received_at
+            if received_at:
+                QUEUE_WAIT.observe(wall_time() - received_at)
+            if update.timeframe:
+                BARS.labels(update.timeframe).inc()
+            else:
+                TICKS.labels(update.security_id).inc()
+            started = perf_counter()
+            _process_tick(update, wl_manager, dispatcher, state_store, clock)
+            EVAL_SECONDS.observe(perf_counter() - started)
+        # Queue.get() does not yield while ticks are pending; let the sender workers run
+        await asyncio.sleep(0)
 
 
 # import asyncio
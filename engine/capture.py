@@ -0,0 +1,45 @@
+# engine/capture.py
+import json
+from datetime import datetime
+
+
+class CaptureDispatcher:
+    """
+    Drop-in for AlertDispatcher that records alerts instead of sending them
+    (replays / backtests). With a TickClock each alert carries the engine
+    time it fired at; `out` (an open text file) gets one JSON line per alert.
+    """
+
+    def __init__(self, clock=None, out=None):
+        self.clock = clock
+        self.out = out
+        self.alerts = []
+
+    def enqueue(self, watch, price, description):
+        at = getattr(self.clock, "now", None)
+        alert = {
+            "at": datetime.utcfromtimestamp(at).isoformat() if at is not None else None,
+            "watch_id": watch.get("id"),
+            "user_id": watch.get("user_id"),
+            "symbol": watch.get("symbol"),
+            "rule": watch.get("rule"),
+            "threshold": watch.get("threshold"),
+            "price": price,
+            "description": description,
+        }
+        self.alerts.append(alert)
+        if self.out is not None:
+            self.out.write(json.dumps(alert) + "\n")
+        return True
+
+
+class CaptureStateStore:
+    """Keeps the latest trigger state per watch in memory instead of writing to Supabase."""
+
+    def __init__(self):
+        self.states = {}
+        self.writes = 0
+
+    def record(self, watch_id, active_state, at=None):
+        self.states[watch_id] = (active_state, at)
+        self.writes += 1
@@ -0,0 +1,310 @@
+import asyncio
+import multiprocessing as mp
+import threading
+import zlib
+
+from core.watchlist_manager import WatchlistManager
+from engine.alert_engine import _process_tick, TICKS, BARS, ALERTS_FIRED
+from engine.vector_eval import VectorIndex
+
+
+def shard_for(security_id, num_shards: int) -> int:
+    """Stable security_id -> shard mapping (same in every process)."""
+    return zlib.crc32(str(security_id).encode()) % num_shards
+
+
+MAX_SHARD_RESTARTS = 3       # per shard; a shard dying more often than that stops the engine
+SHARD_CHECK_INTERVAL = 1.0   # seconds between shard liveness checks while routing
+
+
+class _ShardOutput:
+    """
+    Stands in for the dispatcher and state store inside a shard process.
+    Alerts carry the watch's previous last_triggered_at, so the parent can
+    have the shard undo the trigger if its dispatcher drops the alert.
+    """
+
+    def __init__(self):
+        self.alerts = []
+        self.states = []
+
+    def enqueue(self, watch, price, description):
+        # called before the engine applies the trigger state to `watch`
+        self.alerts.append((watch, price, description, watch.get("last_triggered_at")))
+        return True
+
+    def record(self, watch_id, active_state, at=None):
+        self.states.append((watch_id, active_state, at))
+
+    def drain(self):
+        out = (self.alerts, self.states)
+        self.alerts, self.states = [], []
+        return out
+
+
+def _shard_main(index, watches, inbox, outbox, vectorized=False):
+    """
+    Shard process: owns its slice of the watchlist (with its own rule cache
+    and threshold index) and evaluates the ticks routed to it.
+    """
+    wl_manager = WatchlistManager(None, None)
+    wl_manager.load_watches(watches)
+    if vectorized:
+        wl_manager.vector_index = VectorIndex(wl_manager)
+    output = _ShardOutput()
+    print(f"[Shard {index}] Ready with {len(watches)} watches.")
+
+    while True:
+        kind, body = inbox.get()
+        if kind == "ticks":
+            for update in body:
+                _process_tick(update, wl_manager, output, output)
+            if output.alerts or output.states:
+                outbox.put(("output", output.drain()))
+        elif kind == "event":
+            wl_manager._handle_event(body)
+        elif kind == "dropped":
+            # the parent's dispatcher was full: untrigger so they fire again
+            for sec_id, watch_id, previous_at in body:
+                wl_manager.revert_trigger(sec_id, watch_id, previous_at)
+        elif kind == "sync":
+            outbox.put(("synced", (index, body)))
+        elif kind == "stop":
+            break
+    print(f"[Shard {index}] Exiting.")
+
+
+class ShardedAlertEngine:
+    """
+    Runs alert evaluation in `num_shards` worker processes.
+
+    Ticks are partitioned by a hash of security_id, so each shard only holds
+    the watches (and compiled rules) of its own securities. Realtime watch
+    changes received by the parent WatchlistManager are forwarded to the
+    owning shard. Fired alerts and trigger-state changes come back on one
+    shared queue and are handed to the parent's dispatcher and state store;
+    an alert the dispatcher drops is not recorded as fired, and its shard
+    reverts the trigger so the watch fires again on a later tick. A shard
+    process that dies is restarted from the current watchlist (up to
+    MAX_SHARD_RESTARTS times, then run() raises).
+
+    engine_ticks_total, engine_bars_total and engine_alerts_fired_total are
+    counted here in the parent as ticks are routed and alerts come back. The
+    other engine_* metrics (evaluation time, tick gaps) are recorded inside
+    the shard processes and are not exported.
+    """
+
+    def __init__(self, num_shards, wl_manager, dispatcher, state_store, vectorized=False):
+        self.num_shards = num_shards
+        self.vectorized = vectorized
+        self.wl_manager = wl_manager
+        self.dispatcher = dispatcher
+        self.state_store = state_store
+
+        self._ctx = mp.get_context("spawn")
+        self._inboxes = []
+        self._outbox = None
+        self._procs = []
+        self._pump_thread = None
+        self._loop = None
+        self._sync_waiters = {}
+        self._sync_seq = 0
+        self._watch_securities = {}  # watch id -> security_id its shard holds it under
+
+        # stats
+        self.ticks_routed = [0] * num_shards
+        self.alerts_received = 0
+        self.alerts_reverted = 0
+        self.restarts = [0] * num_shards
+
+    # ────────────────────────────────
+    #  Lifecycle
+    # ────────────────────────────────
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._outbox = self._ctx.Queue()
+
+        for sec_id, watches in self.wl_manager.WATCHLIST.items():
+            for w in watches:
+                self._watch_securities[w["id"]] = str(sec_id)
+
+        self._inboxes = [None] * self.num_shards
+        self._procs = [None] * self.num_shards
+        for i in range(self.num_shards):
+            self._spawn(i)
+
+        self.wl_manager.event_listeners.append(self._forward_event)
+        self._pump_thread = threading.Thread(target=self._pump_output, daemon=True)
+        self._pump_thread.start()
+        print(f"[ShardedEngine] Started {self.num_shards} shards.")
+
+    def _spawn(self, i):
+        """Start shard `i` with its slice of the parent's current watchlist."""
+        watches = [w for sec_id, ws in self.wl_manager.WATCHLIST.items()
+                   if shard_for(sec_id, self.num_shards) == i for w in ws]
+        inbox = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_shard_main, args=(i, watches, inbox, self._outbox, self.vectorized), daemon=True
+        )
+        proc.start()
+        self._inboxes[i] = inbox
+        self._procs[i] = proc
+
+    def check_shards(self):
+        """Restart shards whose process died; raises once one has died too often."""
+        for i, proc in enumerate(self._procs):
+            if proc.is_alive():
+                continue
+            self.restarts[i] += 1
+            if self.restarts[i] > MAX_SHARD_RESTARTS:
+                raise RuntimeError(f"Shard {i} died {self.restarts[i]} times (exit code {proc.exitcode})")
+            print(f"⚠️ [ShardedEngine] Shard {i} died (exit code {proc.exitcode}); "
+                  f"restarting it ({self.restarts[i]}/{MAX_SHARD_RESTARTS}).")
+            self._spawn(i)
+
+    def stop(self):
+        if self._forward_event in self.wl_manager.event_listeners:
+            self.wl_manager.event_listeners.remove(self._forward_event)
+        for inbox in self._inboxes:
+            inbox.put(("stop", None))
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._outbox.put(("stop", None))
+        print("[ShardedEngine] Stopped.")
+
+    # ────────────────────────────────
+    #  Parent side: routing in, merging out
+    # ────────────────────────────────
+
+    async def run(self, price_stream):
+        print(f"⚡ Sharded alert engine routing ticks to {self.num_shards} shards...")
+        batched = hasattr(price_stream, "get_batch")
+        next_check = 0.0
+        while True:
+            if batched:
+                updates = await price_stream.get_batch()
+            else:
+                updates = [await price_stream.get()]
+                # take whatever else is already queued so each IPC message carries a batch
+                while not price_stream.empty() and len(updates) < 1000:
+                    updates.append(price_stream.get_nowait())
+            # a dead shard would swallow its securities' ticks without a word
+            now = self._loop.time()
+            if now >= next_check:
+                next_check = now + SHARD_CHECK_INTERVAL
+                self.check_shards()
+            self.route(updates)
+            await asyncio.sleep(0)
+
+    def route(self, updates):
+        per_shard = [[] for _ in range(self.num_shards)]
+        for update in updates:
+            per_shard[shard_for(update.security_id, self.num_shards)].append(update)
+            if update.timeframe:
+                BARS.labels(update.timeframe).inc()
+            else:
+                TICKS.labels(update.security_id).inc()
+        for i, ticks in enumerate(per_shard):
+            if ticks:
+                self.ticks_routed[i] += len(ticks)
+                self._inboxes[i].put(("ticks", ticks))
+
+    async def sync(self, timeout: float = 30.0):
+        """
+        Wait until every shard has processed everything routed to it so far.
+        Raises RuntimeError if a shard process has died, TimeoutError after `timeout`.
+        """
+        self._sync_seq += 1
+        token = self._sync_seq
+        waiter = self._loop.create_future()
+        self._sync_waiters[token] = [waiter, self.num_shards]
+        for inbox in self._inboxes:
+            inbox.put(("sync", token))
+        deadline = self._loop.time() + timeout
+        try:
+            while not waiter.done():
+                dead = [i for i, proc in enumerate(self._procs) if not proc.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Shard(s) {dead} exited before syncing")
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Shards did not sync within {timeout}s")
+                # wake up now and then to notice a dead shard
+                await asyncio.wait([waiter], timeout=min(1.0, remaining))
+        finally:
+            self._sync_waiters.pop(token, None)
+
+    def _forward_event(self, payload):
+        data = payload.get("data", {})
+        event = data.get("type")
+        record = data.get("record") or {}
+        if event in ("INSERT", "UPDATE") and record.get("security_id") is not None:
+            watch_id, sec_id = record.get("id"), str(record["security_id"])
+            old_sec_id = self._watch_securities.get(watch_id)
+            self._watch_securities[watch_id] = sec_id
+            inbox = self._inboxes[shard_for(sec_id, self.num_shards)]
+            if event == "UPDATE" and old_sec_id is not None and old_sec_id != sec_id:
+                # security_id changed: drop it where it was, insert it where it now belongs
+                delete = {"data": {"type": "DELETE", "old_record": {"id": watch_id}}}
+                self._inboxes[shard_for(old_sec_id, self.num_shards)].put(("event", delete))
+                inbox.put(("event", {"data": {**data, "type": "INSERT"}}))
+            else:
+                inbox.put(("event", payload))
+        else:
+            # DELETE only carries the id: let every shard drop it if it has it
+            if event == "DELETE":
+                self._watch_securities.pop((data.get("old_record") or {}).get("id"), None)
+            for inbox in self._inboxes:
+                inbox.put(("event", payload))
+
+    def _pump_output(self):
+        while True:
+            kind, body = self._outbox.get()
+            if kind == "stop":
+                break
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, kind, body)
+            except RuntimeError:
+                break  # event loop closed while shards were still reporting
+
+    def _deliver(self, kind, body):
+        if kind == "output":
+            alerts, states = body
+            self.alerts_received += len(alerts)
+            dropped = {}
+            for watch, price, description, previous_at in alerts:
+                if self.dispatcher.enqueue(watch, price, description):
+                    ALERTS_FIRED.inc()
+                    continue
+                sec_id = str(watch["security_id"])
+                dropped[watch["id"]] = (sec_id, watch["id"], previous_at)
+            for watch_id, active_state, at in states:
+                if active_state and watch_id in dropped:
+                    continue  # never dispatched: not fired
+                self.state_store.record(watch_id, active_state, at)
+            if dropped:
+                self.alerts_reverted += len(dropped)
+                per_shard = {}
+                for entry in dropped.values():
+                    per_shard.setdefault(shard_for(entry[0], self.num_shards), []).append(entry)
+                for i, entries in per_shard.items():
+                    self._inboxes[i].put(("dropped", entries))
+        elif kind == "synced":
+            _, token = body
+            entry = self._sync_waiters.get(token)
+            if entry:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._sync_waiters[token]
+                    entry[0].set_result(None)
+
+    def stats(self):
+        return {
+            "shards": self.num_shards,
+            "ticks_routed": list(self.ticks_routed),
+            "alerts_received": self.alerts_received,
+            "alerts_reverted": self.alerts_reverted,
+            "alive": sum(p.is_alive() for p in self._procs),
+            "restarts": list(self.restarts),
+        }
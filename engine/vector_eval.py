@@ -0,0 +1,115 @@
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # vectorized evaluation is optional
+    np = None
+
+ABOVE, BELOW = 1, 2
+RULE_CODES = {"ABOVE": ABOVE, "BELOW": BELOW}
+
+
+def _utc_epoch(naive_utc: datetime) -> float:
+    return (naive_utc - datetime(1970, 1, 1)).total_seconds()
+
+
+def is_vectorizable(watch: dict) -> bool:
+    """
+    ABOVE/BELOW watches with plain numeric fields and a pre-parsed cooldown
+    expiry. Anything else (other rule types, missing or unparseable values)
+    stays on the object path so behaviour is unchanged.
+    """
+    if str(watch.get("rule", "")).upper() not in RULE_CODES or watch.get("timeframe"):
+        return False
+    if watch.get("_cooldown_until") is None:
+        return False
+    try:
+        float(watch["threshold"])
+        float(watch.get("cooldown_minutes", 5))
+    except (KeyError, TypeError, ValueError):
+        return False
+    return True
+
+
+class VectorBook:
+    """
+    Struct-of-arrays view of one security's ABOVE/BELOW watches.
+
+    `evaluate()` reproduces AlertRule.should_trigger for every watch at once:
+        fire  = enabled & condition & ~state & (now > cooldown_expiry)
+        reset = ~condition & state
+    """
+
+    def __init__(self, watches: list):
+        self.watches = watches
+        # the security's other watches stay on the threshold-index path
+        self.ids = frozenset(w["id"] for w in watches)
+        n = len(watches)
+        self.thresholds = np.empty(n, dtype=np.float64)
+        self.codes = np.empty(n, dtype=np.int8)
+        self.enabled = np.empty(n, dtype=bool)
+        self.states = np.empty(n, dtype=bool)
+        self.cooldown_s = np.empty(n, dtype=np.float64)
+        self.cooldown_expiry = np.empty(n, dtype=np.float64)
+
+        for i, w in enumerate(watches):
+            self.thresholds[i] = float(w["threshold"])
+            self.codes[i] = RULE_CODES[w["rule"].upper()]
+            self.enabled[i] = bool(w.get("enabled", True))
+            self.states[i] = bool(w.get("last_triggered_state", False))
+            self.cooldown_s[i] = float(w.get("cooldown_minutes", 5)) * 60
+            self.cooldown_expiry[i] = w["_cooldown_until"]
+        self._is_above = self.codes == ABOVE
+
+    def evaluate(self, price: float, now: float):
+        """Return (fire_indices, reset_indices) for a tick at `price`, `now` in epoch seconds."""
+        condition = np.where(self._is_above, price > self.thresholds, price < self.thresholds)
+        fire = self.enabled & condition & ~self.states & (now > self.cooldown_expiry)
+        reset = ~condition & self.states
+        return np.flatnonzero(fire), np.flatnonzero(reset)
+
+    def set_state(self, i: int, active_state: bool, at_epoch: float):
+        """Mirror a trigger-state transition the engine applied to watches[i]."""
+        self.states[i] = active_state
+        self.cooldown_expiry[i] = at_epoch + self.cooldown_s[i]
+
+
+class VectorIndex:
+    """
+    Lazily built VectorBooks for securities with at least `min_watches`
+    vectorizable watches. WatchlistManager invalidates a security's book on
+    any realtime change to it; the book is rebuilt on that security's next tick.
+    """
+
+    def __init__(self, wl_manager, min_watches: int = 64):
+        if np is None:
+            raise RuntimeError("numpy is required for vectorized evaluation")
+        self.wl_manager = wl_manager
+        self.min_watches = min_watches
+        self._books = {}  # sec_id -> VectorBook, or None if below min_watches
+        self.rebuilds = 0
+
+    def book_for(self, sec_id):
+        sec_id = str(sec_id)
+        if sec_id in self._books:
+            return self._books[sec_id]
+        # timeframe watches are evaluated on bar closes, not ticks
+        watches = [w for w in self.wl_manager.get_watches_for(sec_id)
+                   if not w.get("timeframe") and is_vectorizable(w)]
+        book = VectorBook(watches) if len(watches) >= self.min_watches else None
+        self._books[sec_id] = book
+        self.rebuilds += 1
+        return book
+
+    def invalidate(self, sec_id=None):
+        if sec_id is None:
+            self._books.clear()
+        else:
+            self._books.pop(str(sec_id), None)
+
+    def stats(self):
+        return {
+            "books": sum(1 for b in self._books.values() if b is not None),
+            "vectorized_watches": sum(len(b.watches) for b in self._books.values() if b is not None),
+            "rebuilds": self.rebuilds,
+        }
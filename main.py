@@ -1,8 +1,18 @@
 import os
 import asyncio
+import argparse
 from core.watchlist_manager import WatchlistManager
 from core.feeds.feed_manager import FeedManager
 from engine.alert_engine import alert_engine
+from engine.alert_dispatcher import AlertDispatcher
+from engine.sharded_engine import ShardedAlertEngine
+from core.metrics import start_metrics_server
+from core import log
+from core.candles import CandleBuilder, CandleStage, parse_timeframes
+from integrations.telegram_sender import send_alert
+from data.state_store import WriteBehindStateStore
+from data.storage import bulk_update_last_triggered
+from data.tick_journal import TickJournal
 from dotenv import load_dotenv
 load_dotenv() 
 
@@ -10,17 +20,83 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 DHAN_CLIENT_ID = os.getenv("DHAN_CLIENT_ID")
 DHAN_ACCESS_TOKEN = os.getenv("DHAN_ACCESS_TOKEN")
+FEED_CONFLATE = os.getenv("FEED_CONFLATE", "0") == "1"
+PRICE_QUEUE_MAXSIZE = int(os.getenv("PRICE_QUEUE_MAXSIZE", "0"))  # 0 = unbounded
+PRICE_QUEUE_POLICY = os.getenv("PRICE_QUEUE_POLICY", "drop_oldest")  # drop_oldest | drop_oldest_per_security | block
+PRICE_QUEUE_MAX_AGE = float(os.getenv("PRICE_QUEUE_MAX_AGE", "0")) or None  # seconds behind LTT; 0 = off
+FEED_CONNECTIONS = int(os.getenv("FEED_CONNECTIONS", "1"))  # websockets to spread subscriptions over
+FEED_MAX_PER_CONNECTION = int(os.getenv("FEED_MAX_PER_CONNECTION", "5000"))
+FEED_HANDOFF_DELAY = float(os.getenv("FEED_HANDOFF_DELAY", "0"))  # seconds ticks may wait to join a batch
+FEED_BACKEND = os.getenv("FEED_BACKEND", "sdk")  # sdk (MarketFeed threads) or native (asyncio binary client)
+DHAN_FEED_URL = os.getenv("DHAN_FEED_URL")  # native backend only, e.g. ws://localhost:8765 for the mock server
+ALERT_SENDERS = int(os.getenv("ALERT_SENDERS", "4"))
+ENGINE_SHARDS = int(os.getenv("ENGINE_SHARDS", "1"))
+ENGINE_VECTORIZE = os.getenv("ENGINE_VECTORIZE", "0") == "1"  # needs numpy
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the endpoint
+CANDLE_TIMEFRAMES = parse_timeframes(os.getenv("CANDLE_TIMEFRAMES", "1m,5m,15m"))  # empty disables bars
+TICK_JOURNAL_DIR = os.getenv("TICK_JOURNAL_DIR")  # unset = don't record ticks
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = log.parse_levels(os.getenv("LOG_LEVELS"))  # e.g. feed=DEBUG,engine=WARNING
 
 
-async def main():
+async def main(shards=ENGINE_SHARDS):
+    log.configure(LOG_LEVEL, LOG_LEVELS)
+    if METRICS_PORT:
+        await start_metrics_server(port=METRICS_PORT)
+
     watch_mgr = WatchlistManager(SUPABASE_URL, SUPABASE_KEY)
     watch_mgr.load_all()
-    await watch_mgr.start_realtime()
+    # realtime listener runs forever, so keep it in the background
+    asyncio.create_task(watch_mgr.start_realtime())
     print(watch_mgr.get_all_security_ids())
-    feed_mgr = FeedManager(DHAN_CLIENT_ID, DHAN_ACCESS_TOKEN, [], watch_mgr)
+    journal = None
+    if TICK_JOURNAL_DIR:
+        journal = TickJournal(TICK_JOURNAL_DIR)
+        journal.start()
+    feed_mgr = FeedManager(DHAN_CLIENT_ID, DHAN_ACCESS_TOKEN, [], watch_mgr, conflate=FEED_CONFLATE,
+                           journal=journal, queue_maxsize=PRICE_QUEUE_MAXSIZE,
+                           overflow=PRICE_QUEUE_POLICY, max_tick_age=PRICE_QUEUE_MAX_AGE,
+                           connections=FEED_CONNECTIONS, max_per_connection=FEED_MAX_PER_CONNECTION,
+                           handoff_delay=FEED_HANDOFF_DELAY, backend=FEED_BACKEND, feed_url=DHAN_FEED_URL)
     feed_mgr.start()
 
-    await alert_engine(feed_mgr.price_queue, watch_mgr)
+    dispatcher = AlertDispatcher(send_alert, workers=ALERT_SENDERS)
+    dispatcher.start()
+    state_store = WriteBehindStateStore(bulk_update_last_triggered)
+    state_store.start()
+
+    price_stream = feed_mgr.price_queue
+    if CANDLE_TIMEFRAMES:
+        # bars are built once here, only for securities a bar-close watch or
+        # timeframe indicator reads, and shared by all of them
+        price_stream = CandleStage(price_stream, CandleBuilder(CANDLE_TIMEFRAMES), close_interval=1.0,
+                                   wanted=watch_mgr.needs_bars)
+        # a security that loses its last bar reader stops holding bars
+        watch_mgr.event_listeners.append(price_stream.prune)
+
+    sharded = None
+    if shards > 1:
+        sharded = ShardedAlertEngine(shards, watch_mgr, dispatcher, state_store, vectorized=ENGINE_VECTORIZE)
+        sharded.start()
+    try:
+        if sharded:
+            await sharded.run(price_stream)
+        else:
+            await alert_engine(price_stream, watch_mgr, dispatcher, state_store,
+                               vectorized=ENGINE_VECTORIZE)
+    finally:
+        feed_mgr.stop()
+        if journal:
+            journal.stop()
+        if sharded:
+            sharded.stop()
+        await dispatcher.stop()
+        await state_store.stop()
+        log.shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Stock price alert engine")
+    parser.add_argument("--shards", type=int, default=ENGINE_SHARDS,
+                        help="number of alert-engine worker processes (1 = run in this process)")
+    args = parser.parse_args()
+    asyncio.run(main(args.shards))
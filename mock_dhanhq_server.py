@@ -1,9 +1,14 @@
+import argparse
 import asyncio
+import functools
 import random
 import json
+import time
 import websockets
 from datetime import datetime
 
+from core.feeds.dhan_binary import SUBSCRIBE_TICKER, UNSUBSCRIBE_TICKER, ticker_packet, disconnect_packet
+
 async def mock_price_feed(websocket, path):
     symbols = ["AAPL", "TSLA", "GOOG"]
     prices = {s: random.uniform(90, 110) for s in symbols}
@@ -35,10 +40,66 @@ async def mock_price_feed(websocket, path):
     except Exception as e:
         print(f"⚠️ Unexpected error in connection handler ({client}): {e}")
 
-async def main():
-    print("🚀 Mock DhanHQ WebSocket running on ws://localhost:8765")
-    async with websockets.serve(mock_price_feed, "localhost", 8765, ping_interval=None):
+async def mock_binary_feed(websocket, path=None, interval=1.0, drop_after=None):
+    """
+    Dhan v2 binary feed: honours JSON ticker (un)subscribe requests and sends
+    a ticker packet per subscribed security every `interval` seconds. With
+    `drop_after`, the connection is cut with a disconnect packet after that
+    many seconds (to exercise client reconnects).
+    """
+    subscribed = set()
+    prices = {}
+    client = websocket.remote_address
+    print(f"📡 New binary client connected from {client}")
+
+    async def read_requests():
+        async for message in websocket:
+            request = json.loads(message)
+            ids = {int(i["SecurityId"]) for i in request.get("InstrumentList", [])}
+            if request.get("RequestCode") == SUBSCRIBE_TICKER:
+                subscribed.update(ids)
+            elif request.get("RequestCode") == UNSUBSCRIBE_TICKER:
+                subscribed.difference_update(ids)
+            print(f"[{datetime.now():%H:%M:%S}] Request {request.get('RequestCode')} "
+                  f"for {len(ids)} instruments → {len(subscribed)} subscribed")
+
+    reader = asyncio.create_task(read_requests())
+    connected_at = time.time()
+    try:
+        while not reader.done():
+            now = time.time()
+            if drop_after and now - connected_at > drop_after:
+                print(f"✂️ Dropping client {client}")
+                await websocket.send(disconnect_packet(805))
+                await websocket.close()
+                break
+            for sec_id in list(subscribed):
+                price = prices.get(sec_id) or random.uniform(90, 110)
+                prices[sec_id] = price = max(1, price + random.uniform(-0.5, 0.5))
+                await websocket.send(ticker_packet(sec_id, round(price, 2), now))
+            await asyncio.sleep(interval)
+    except websockets.exceptions.ConnectionClosed:
+        print(f"❌ Client {client} disconnected — closing connection cleanly.")
+    finally:
+        reader.cancel()
+
+
+async def main(binary=False, port=8765, interval=1.0, drop_after=None):
+    if binary:
+        handler = functools.partial(mock_binary_feed, interval=interval, drop_after=drop_after)
+        print(f"🚀 Mock DhanHQ binary feed running on ws://localhost:{port} (FEED_BACKEND=native "
+              f"DHAN_FEED_URL=ws://localhost:{port})")
+    else:
+        handler = mock_price_feed
+        print(f"🚀 Mock DhanHQ WebSocket running on ws://localhost:{port}")
+    async with websockets.serve(handler, "localhost", port, ping_interval=None):
         await asyncio.Future()  # Keep running forever
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Mock DhanHQ feed for local testing")
+    parser.add_argument("--binary", action="store_true", help="speak the Dhan v2 binary ticker format")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between ticks per security")
+    parser.add_argument("--drop-after", type=float, help="binary mode: cut each connection after N seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.binary, args.port, args.interval, args.drop_after))
@@ -0,0 +1,167 @@
+"""
+Replay recorded ticks through the real alert engine and rule classes.
+
+    python replay_main.py ticks.jsonl --watches watches.json --speed max --alerts alerts.jsonl
+    python replay_main.py ticks.csv --date 2025-01-06 --speed 10
+
+Ticks are JSON lines or CSV rows with security_id, price and LTT, as
+FeedManager emits them, or a tick journal segment (ticks-YYYYMMDD.bin).
+The engine clock follows the recorded LTT, so cooldowns and PERCENT_MOVE
+windows behave as they did in the session;
+--speed paces the stream at 1x / Nx of the recorded gaps or 'max'.
+Alerts go to a capture sink (and optionally a JSONL file), never Telegram.
+Watches come from a JSON file, or from Supabase when --watches is omitted.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from core.watchlist_manager import WatchlistManager
+from core.ticks import Tick, TickClock, ltt_to_epoch
+from core import log
+from data.tick_journal import TickJournalReader
+from engine.alert_engine import alert_engine
+from engine.capture import CaptureDispatcher, CaptureStateStore
+from core.candles import CandleBuilder, CandleStage, parse_timeframes
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def read_ticks(path, session_date=None):
+    """Load ticks and resolve each LTT to epoch seconds (HH:MM:SS is taken on `session_date`)."""
+    day = session_date or datetime.now(IST).date()
+    # any instant inside the IST session day anchors HH:MM:SS LTTs to it
+    anchor = datetime(day.year, day.month, day.day, 12, tzinfo=IST).timestamp()
+
+    if path.endswith(".bin"):
+        with TickJournalReader(path) as journal:
+            return [Tick(str(sec_id), ltp, ltt) for sec_id, ltp, ltt, _ in journal]
+
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    return [Tick(str(row["security_id"]), float(row["price"]), ltt_to_epoch(row.get("LTT"), now=anchor))
+            for row in rows]
+
+
+def load_watches(path):
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    from data.storage import list_all_watches
+    return list_all_watches()
+
+
+def reset_trigger_state(watches):
+    """Start every watch untriggered, as at the open of the replayed session."""
+    for w in watches:
+        w["last_triggered_at"] = None
+        w["last_triggered_state"] = False
+
+
+async def feed(queue, ticks, speed):
+    """Put ticks on the queue, sleeping the recorded LTT gaps divided by `speed` (None = no pacing)."""
+    if speed is None:
+        for tick in ticks:
+            queue.put_nowait(tick)
+        return
+    started = time.monotonic()
+    first = ticks[0].ltt if ticks else 0.0
+    for tick in ticks:
+        delay = (tick.ltt - first) / speed - (time.monotonic() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        queue.put_nowait(tick)
+
+
+async def drain(queue):
+    # the engine evaluates a tick synchronously after taking it off the queue
+    while not queue.empty():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+async def replay(ticks, watches, speed=None, vectorized=False, alerts_out=None, timeframes=()):
+    wl_manager = WatchlistManager(None, None)
+    wl_manager.load_watches(watches)
+    clock = TickClock()
+    dispatcher = CaptureDispatcher(clock, alerts_out)
+    state_store = CaptureStateStore()
+    queue = asyncio.Queue()
+
+    # bars close on the next tick's LTT only: wall time means nothing in a replay
+    stream = CandleStage(queue, CandleBuilder(timeframes), wanted=wl_manager.needs_bars) if timeframes else queue
+
+    started = time.perf_counter()
+    engine = asyncio.create_task(
+        alert_engine(stream, wl_manager, dispatcher, state_store, vectorized=vectorized, clock=clock)
+    )
+    await feed(queue, ticks, speed)
+    await drain(queue)
+    if timeframes:
+        # bars still open when the recording ends close on it, not on a tick that never comes
+        for event in stream.close_all():
+            queue.put_nowait(event)
+        await drain(queue)
+    elapsed = time.perf_counter() - started
+    engine.cancel()
+
+    return {
+        "ticks": len(ticks),
+        "watches": len(watches),
+        "seconds": round(elapsed, 4),
+        "ticks_per_s": round(len(ticks) / elapsed, 1) if elapsed else None,
+        "alerts": len(dispatcher.alerts),
+        "state_writes": state_store.writes,
+        "session": [
+            datetime.utcfromtimestamp(ticks[0].ltt).isoformat() if ticks else None,
+            datetime.utcfromtimestamp(ticks[-1].ltt).isoformat() if ticks else None,
+        ],
+    }
+
+
+def parse_speed(text):
+    return None if text.lower() in ("max", "0") else float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ticks", help="recorded ticks (.jsonl, .csv or a tick journal .bin segment)")
+    parser.add_argument("--watches", help="JSON list of watch rows (default: load from Supabase)")
+    parser.add_argument("--speed", type=parse_speed, default=None, help="1, N or 'max' (default: max)")
+    parser.add_argument("--date", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="session date for HH:MM:SS LTTs (default: today, IST)")
+    parser.add_argument("--keep-state", action="store_true",
+                        help="keep the watches' stored trigger state instead of starting untriggered")
+    parser.add_argument("--vectorized", action="store_true", help="enable the NumPy evaluation path")
+    parser.add_argument("--alerts", help="write captured alerts to this JSONL file")
+    parser.add_argument("--timeframes", type=parse_timeframes, default=parse_timeframes("1m,5m,15m"),
+                        help="bar timeframes for bar-close watches, e.g. 1m,5m (empty disables)")
+    args = parser.parse_args()
+
+    log.configure(os.getenv("LOG_LEVEL", "WARNING"), log.parse_levels(os.getenv("LOG_LEVELS")))
+    ticks = read_ticks(args.ticks, args.date)
+    watches = load_watches(args.watches)
+    if not args.keep_state:
+        reset_trigger_state(watches)
+
+    alerts_out = open(args.alerts, "w") if args.alerts else None
+    try:
+        report = asyncio.run(replay(ticks, watches, args.speed, args.vectorized, alerts_out,
+                                     args.timeframes))
+    finally:
+        if alerts_out:
+            alerts_out.close()
+        log.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
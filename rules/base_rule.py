@@ -19,10 +19,11 @@ class AlertRule(ABC):
         pass
 
     # --- Unified trigger logic ---
-    def should_trigger(self, price: float, watch: dict) -> bool:
+    def should_trigger(self, price: float, watch: dict, now: float | None = None) -> bool:
         """
         Determine whether an alert should be triggered.
         Combines condition, cooldown, and state tracking.
+        `now` (epoch seconds) is the engine clock; defaults to wall time.
         """
         
         # Skip trigger if disabled
@@ -38,8 +39,15 @@ class AlertRule(ABC):
             return False
 
         # Case 2: Condition met but cooldown still active → suppress duplicate alert
-        if condition and not self.cooldown.is_cooldown_over(last_time):
-            return False
+        if condition:
+            # expiry pre-parsed by WatchlistManager; parse the ISO string only as a fallback
+            cooldown_until = watch.get("_cooldown_until")
+            if cooldown_until is not None:
+                cooldown_over = CooldownManager.is_expired(cooldown_until, now)
+            else:
+                cooldown_over = self.cooldown.is_cooldown_over(last_time, now)
+            if not cooldown_over:
+                return False
 
         # Case 3: Condition met, cooldown expired, and was previously inactive → fire alert
         if condition and not prev_state:
@@ -48,6 +56,18 @@ class AlertRule(ABC):
         # Case 4: Condition true but was already active (no reset yet) → skip
         return False
 
+    def required_windows(self) -> tuple:
+        """Tick-history windows (seconds) this rule reads from its window service."""
+        return ()
+
+    def required_indicators(self) -> tuple:
+        """Indicator keys (see core/indicators.py) this rule reads from its IndicatorService."""
+        return ()
+
+    def required_expressions(self) -> tuple:
+        """Expression trees this rule compiled into its security's shared ExpressionScope."""
+        return ()
+
     # --- Description interface ---
     @abstractmethod
     def describe(self, price: float = None) -> str:
@@ -1,12 +1,45 @@
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 
 class CooldownManager:
     def __init__(self, cooldown_minutes: int = 5):
         self.cooldown = timedelta(minutes=cooldown_minutes)
 
-    def is_cooldown_over(self, last_triggered_time: str | None) -> bool:
+    def is_cooldown_over(self, last_triggered_time: str | None, now: float | None = None) -> bool:
         if not last_triggered_time:
             return True
-        
+
         last_time = datetime.fromisoformat(last_triggered_time)
-        return datetime.utcnow() - last_time > self.cooldown
+        current = datetime.utcnow() if now is None else datetime.utcfromtimestamp(now)
+        return current - last_time > self.cooldown
+
+    @staticmethod
+    def is_expired(cooldown_until: float, now: float | None = None) -> bool:
+        """Hot-path check against a pre-parsed expiry (see cooldown_expiry)."""
+        return (time.time() if now is None else now) > cooldown_until
+
+
+NO_COOLDOWN = float("-inf")
+
+
+def cooldown_expiry(watch: dict) -> float:
+    """
+    Epoch seconds after which the watch's cooldown is over, parsed once from
+    last_triggered_at (naive timestamps are UTC, as the engine writes them).
+    """
+    last = watch.get("last_triggered_at")
+    if not last:
+        return NO_COOLDOWN
+    last_time = datetime.fromisoformat(last)
+    if last_time.tzinfo is None:
+        last_time = last_time.replace(tzinfo=timezone.utc)
+    return last_time.timestamp() + float(watch.get("cooldown_minutes", 5)) * 60
+
+
+def prepare_cooldown(watch: dict):
+    """Cache the cooldown expiry on the watch dict as `_cooldown_until`."""
+    try:
+        watch["_cooldown_until"] = cooldown_expiry(watch)
+    except (TypeError, ValueError):
+        # unparseable row: AlertRule falls back to parsing (and reporting) it per tick
+        watch.pop("_cooldown_until", None)
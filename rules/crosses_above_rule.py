@@ -0,0 +1,33 @@
+from .base_rule import AlertRule
+
+class CrossesAboveRule(AlertRule):
+    """
+    Fires when the price moves from at/below the threshold to above it.
+    Unlike ABOVE, a price that is already above the threshold when the
+    watch loads does not fire until it has been seen at or below it.
+    """
+
+    def __init__(self, symbol: str, threshold: float, cooldown_minutes: int = 5):
+        super().__init__(symbol, threshold, cooldown_minutes)
+        self._armed = False    # seen at/below the threshold since the last crossing
+        self._latched = False  # fired on the current crossing; holds until the price goes back
+
+    def condition_met(self, price: float) -> bool:
+        if price <= self.threshold:
+            self._armed = True
+            self._latched = False
+            return False
+        return self._armed or self._latched
+
+    def should_trigger(self, price: float, watch: dict, now: float | None = None) -> bool:
+        triggered = super().should_trigger(price, watch, now)
+        if price > self.threshold:
+            # this crossing is used up, whether it fired or was held back by cooldown
+            self._armed = False
+            self._latched = self._latched or triggered
+        return triggered
+
+    def describe(self, price: float = None) -> str:
+        if price:
+            return f"{self.symbol} crossed ABOVE {self.threshold} (current {price})"
+        return f"Triggers when {self.symbol} crosses ABOVE {self.threshold}"
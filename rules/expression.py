@@ -0,0 +1,491 @@
+# rules/expression.py
+"""
+Watch expressions, e.g.
+
+    price > 100 and pct_move(15m) > 2
+    abs(change(5m)) >= 10 or price < 95
+
+Grammar: `or` / `and` / `not`, comparisons (> >= < <= == !=), + - * /,
+numbers, `price`, durations (30s, 15m, 1h) and the functions
+
+    pct_move(window)   signed % change from the first price in the window
+    change(window)     price change over the window
+    ema(n), sma(n), rsi(n), vwap()
+                       streaming indicators (core/indicators.py) on ticks;
+                       ema(20, 5m) etc. read the indicator on 5m bar closes
+    abs(x), min(a, b, ...), max(a, b, ...)
+
+An expression is parsed and compiled once, when its watch loads, into a
+tree of closures taking the tick price. Compiled sub-expressions are
+interned per security in an ExpressionScope, so watches sharing e.g.
+`pct_move(15m)` share one closure and compute it once per tick. A window
+function with no history yet (or a warming-up indicator) yields None, which
+makes its comparison false.
+"""
+import operator
+import re
+import time
+
+from core.tick_window import TickWindowService
+from core.indicators import INDICATORS, IndicatorService, indicator_key
+from core.candles import TIMEFRAMES
+from .base_rule import AlertRule
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)([smh](?![A-Za-z_]))?|([A-Za-z_]\w*)|(>=|<=|==|!=|[-+*/()<>,]))")
+_COMPARE = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+            "==": operator.eq, "!=": operator.ne}
+_ARITH = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+WINDOW_FUNCTIONS = ("pct_move", "change")
+VALUE_FUNCTIONS = ("abs", "min", "max")
+_TIMEFRAME_NAMES = {seconds: name for name, seconds in TIMEFRAMES.items()}
+_KINDS = {"dur": "a duration like 15m", "name": "a name", "num": "a number"}
+_MISSING = object()
+
+
+# ────────────────────────────────
+#  Parsing
+# ────────────────────────────────
+
+def tokenize(text: str) -> list:
+    tokens, pos, text = [], 0, text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m:
+            raise ExpressionError(f"Unexpected {text[pos:].strip()[:10]!r} at position {pos}")
+        number, unit, name, op = m.groups()
+        if number is not None:
+            tokens.append(("dur", float(number) * _UNITS[unit]) if unit else ("num", float(number)))
+        elif name is not None:
+            tokens.append(("name", name.lower()))
+        else:
+            tokens.append(("op", op))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the token list; produces a tuple AST."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, kind=None, value=None):
+        if self.i >= len(self.tokens):
+            return None
+        tok = self.tokens[self.i]
+        if (kind and tok[0] != kind) or (value is not None and tok[1] != value):
+            return None
+        return tok
+
+    def take(self, kind=None, value=None):
+        tok = self.peek(kind, value)
+        if tok is None:
+            found = self.tokens[self.i][1] if self.i < len(self.tokens) else "end of expression"
+            raise ExpressionError(f"Expected {value or _KINDS.get(kind, kind)}, found {found!r}")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self.or_()
+        if self.i != len(self.tokens):
+            raise ExpressionError(f"Unexpected {self.tokens[self.i][1]!r}")
+        return node
+
+    def or_(self):
+        node = self.and_()
+        while self.peek("name", "or"):
+            self.i += 1
+            node = ("or", node, self.and_())
+        return node
+
+    def and_(self):
+        node = self.not_()
+        while self.peek("name", "and"):
+            self.i += 1
+            node = ("and", node, self.not_())
+        return node
+
+    def not_(self):
+        if self.peek("name", "not"):
+            self.i += 1
+            return ("not", self.not_())
+        return self.compare()
+
+    def compare(self):
+        node = self.sum()
+        tok = self.peek("op")
+        if tok and tok[1] in _COMPARE:
+            self.i += 1
+            node = ("cmp", tok[1], node, self.sum())
+        return node
+
+    def sum(self):
+        node = self.term()
+        while self.peek("op", "+") or self.peek("op", "-"):
+            op = self.take()[1]
+            node = ("arith", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek("op", "*") or self.peek("op", "/"):
+            op = self.take()[1]
+            node = ("arith", op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek("op", "-"):
+            self.i += 1
+            return ("neg", self.unary())
+        return self.atom()
+
+    def atom(self):
+        if self.peek("num"):
+            return ("num", self.take()[1])
+        if self.peek("op", "("):
+            self.i += 1
+            node = self.or_()
+            self.take("op", ")")
+            return node
+        name = self.take("name")[1]
+        if name == "price":
+            return ("price",)
+        if name in WINDOW_FUNCTIONS:
+            self.take("op", "(")
+            window = self.take("dur")[1]
+            self.take("op", ")")
+            return ("call", name, window)
+        if name in INDICATORS:
+            self.take("op", "(")
+            period = timeframe = None
+            if name != "vwap":
+                period = self.take("num")[1]
+                if period < 1 or period != int(period):
+                    raise ExpressionError(f"{name}() period must be a positive integer")
+            if self.peek("op", ",") or (name == "vwap" and self.peek("dur")):
+                if name != "vwap":
+                    self.i += 1
+                seconds = self.take("dur")[1]
+                timeframe = _TIMEFRAME_NAMES.get(seconds)
+                if timeframe is None:
+                    raise ExpressionError(f"Bar timeframe must be one of {', '.join(TIMEFRAMES)}")
+            self.take("op", ")")
+            return ("ind", indicator_key(name, period, timeframe))
+        if name in VALUE_FUNCTIONS:
+            self.take("op", "(")
+            args = [self.sum()]
+            while self.peek("op", ","):
+                self.i += 1
+                args.append(self.sum())
+            self.take("op", ")")
+            if name == "abs" and len(args) != 1:
+                raise ExpressionError("abs() takes one argument")
+            return ("func", name, tuple(args))
+        raise ExpressionError(f"Unknown name {name!r}")
+
+
+def parse_expression(text: str) -> tuple:
+    """Parse an expression into its AST; raises ExpressionError on bad input."""
+    if not text or not text.strip():
+        raise ExpressionError("Empty expression")
+    return _Parser(tokenize(text)).parse()
+
+
+def _has_window(node) -> bool:
+    """True if the node reads per-tick state (window history or an indicator)."""
+    kind = node[0]
+    if kind in ("call", "ind"):
+        return True
+    if kind == "num":
+        return False
+    if kind == "func":
+        return any(_has_window(a) for a in node[2])
+    return any(isinstance(part, tuple) and _has_window(part) for part in node[1:])
+
+
+def _subtree(node):
+    """The node and every node below it, one entry per occurrence."""
+    yield node
+    if node[0] == "func":
+        for a in node[2]:
+            yield from _subtree(a)
+    elif node[0] not in ("num", "ind", "call"):
+        for part in node[1:]:
+            if isinstance(part, tuple):
+                yield from _subtree(part)
+
+
+def _collect(node, kind: str, out: set):
+    """Window lengths ("call") or indicator keys ("ind") used by an expression."""
+    if node[0] == kind:
+        out.add(node[2] if kind == "call" else node[1])
+    elif node[0] == "func":
+        for a in node[2]:
+            _collect(a, kind, out)
+    elif node[0] not in ("num", "ind", "call"):
+        for part in node[1:]:
+            if isinstance(part, tuple):
+                _collect(part, kind, out)
+    return out
+
+
+# ────────────────────────────────
+#  Compilation
+# ────────────────────────────────
+
+class ExpressionScope:
+    """
+    Compiled sub-expressions of one security. Nodes depending on a window
+    function or indicator are memoized for the current tick; `begin_tick`
+    resets the memo when the (price, last tick time, indicator updates)
+    triple changes.
+
+    Rules `require` their expression tree and `release` it when they go
+    away; a compiled node is dropped once no required tree uses it.
+    """
+
+    def __init__(self, security_id, window_service, indicators=None):
+        self.security_id = security_id
+        self.window_service = window_service
+        self.indicators = indicators
+        self._compiled = {}  # AST -> closure
+        self._refs = {}      # AST -> uses by required trees
+        self.memo = {}
+        self._tick = None
+
+    def begin_tick(self, price):
+        tick = (price, self.window_service.last_time(self.security_id),
+                self.indicators.version(self.security_id) if self.indicators is not None else 0)
+        if tick != self._tick:
+            self._tick = tick
+            self.memo.clear()
+
+    def compile(self, node):
+        fn = self._compiled.get(node)
+        if fn is None:
+            fn = self._build(node)
+            if _has_window(node):
+                fn = self._memoized(node, fn)
+            self._compiled[node] = fn
+        return fn
+
+    def require(self, tree):
+        for node in _subtree(tree):
+            self._refs[node] = self._refs.get(node, 0) + 1
+
+    def release(self, tree):
+        refs = self._refs
+        for node in _subtree(tree):
+            count = refs.get(node)
+            if count is None:
+                continue
+            if count > 1:
+                refs[node] = count - 1
+            else:
+                del refs[node]
+                self._compiled.pop(node, None)
+                self.memo.pop(node, None)
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def _memoized(self, key, fn):
+        memo = self.memo
+
+        def cached(price):
+            value = memo.get(key, _MISSING)
+            if value is _MISSING:
+                value = memo[key] = fn(price)
+            return value
+        return cached
+
+    def _build(self, node):
+        kind = node[0]
+        if kind == "num":
+            value = node[1]
+            return lambda price: value
+        if kind == "price":
+            return lambda price: price
+        if kind == "call":
+            return self._window_function(node[1], node[2])
+        if kind == "ind":
+            indicators, sec_id, key = self.indicators, self.security_id, node[1]
+            if indicators is None:
+                return lambda price: None
+            return lambda price: indicators.value(sec_id, key)
+        if kind == "func":
+            args = [self.compile(a) for a in node[2]]
+            return self._value_function(node[1], args)
+        if kind == "neg":
+            inner = self.compile(node[1])
+
+            def neg(price):
+                v = inner(price)
+                return None if v is None else -v
+            return neg
+        if kind == "arith":
+            op, left, right = _ARITH[node[1]], self.compile(node[2]), self.compile(node[3])
+
+            def arith(price):
+                a, b = left(price), right(price)
+                if a is None or b is None:
+                    return None
+                try:
+                    return op(a, b)
+                except ZeroDivisionError:
+                    return None
+            return arith
+        if kind == "cmp":
+            op, left, right = _COMPARE[node[1]], self.compile(node[2]), self.compile(node[3])
+
+            def compare(price):
+                a, b = left(price), right(price)
+                return a is not None and b is not None and op(a, b)
+            return compare
+        if kind == "and":
+            left, right = self.compile(node[1]), self.compile(node[2])
+            return lambda price: bool(left(price)) and bool(right(price))
+        if kind == "or":
+            left, right = self.compile(node[1]), self.compile(node[2])
+            return lambda price: bool(left(price)) or bool(right(price))
+        if kind == "not":
+            inner = self.compile(node[1])
+            return lambda price: not inner(price)
+        raise ExpressionError(f"Cannot compile {kind!r}")
+
+    def _window_function(self, name, seconds):
+        service, sec_id = self.window_service, self.security_id
+
+        def reference():
+            now = service.last_time(sec_id)
+            if now is None:
+                return None
+            return service.first_price_since(sec_id, now - seconds)
+
+        if name == "pct_move":
+            def pct_move(price):
+                ref = reference()
+                return (price - ref) / ref * 100 if ref else None
+            return pct_move
+
+        def change(price):
+            ref = reference()
+            return None if ref is None else price - ref
+        return change
+
+    @staticmethod
+    def _value_function(name, args):
+        if name == "abs":
+            (arg,) = args
+
+            def absolute(price):
+                v = arg(price)
+                return None if v is None else abs(v)
+            return absolute
+        pick = min if name == "min" else max
+
+        def extreme(price):
+            values = [a(price) for a in args]
+            return None if None in values else pick(values)
+        return extreme
+
+
+class ExpressionPool:
+    """One ExpressionScope per security, shared by every expression watch on it."""
+
+    def __init__(self, window_service, indicators=None):
+        self.window_service = window_service
+        self.indicators = indicators
+        self._scopes = {}
+
+    def scope(self, security_id) -> ExpressionScope:
+        scope = self._scopes.get(security_id)
+        if scope is None:
+            scope = self._scopes[security_id] = ExpressionScope(security_id, self.window_service, self.indicators)
+        return scope
+
+    def require(self, security_id, tree):
+        self.scope(security_id).require(tree)
+
+    def release(self, security_id, tree):
+        scope = self._scopes.get(security_id)
+        if scope is None:
+            return
+        scope.release(tree)
+        if not scope._refs:
+            del self._scopes[security_id]
+
+    def stats(self):
+        return {"securities": len(self._scopes), "nodes": sum(len(s) for s in self._scopes.values())}
+
+
+# ────────────────────────────────
+#  Rule
+# ────────────────────────────────
+
+class ExpressionRule(AlertRule):
+    """
+    Fires when the watch's `expression` becomes true.
+    Example: price > 100 and pct_move(15m) > 2
+
+    With a TickWindowService and ExpressionPool (as in the engine) the
+    expression is compiled into its security's shared scope and reads the
+    pool's IndicatorService; otherwise it keeps a private wall-clock history
+    and tick indicators, like PercentMoveRule.
+    """
+
+    def __init__(self, symbol: str, expression: str, cooldown_minutes: int = 5,
+                 window_service=None, security_id=None, pool=None):
+        super().__init__(symbol, None, cooldown_minutes)
+        self.expression = expression
+        self.security_id = str(security_id) if security_id is not None else None
+        self.tree = tree = parse_expression(expression)
+        self.windows = tuple(sorted(_collect(tree, "call", set())))
+        self.indicator_keys = tuple(sorted(_collect(tree, "ind", set()), key=repr))
+
+        if window_service is not None and pool is not None:
+            self.window_service = window_service
+            self.indicators = pool.indicators
+            self._scope = pool.scope(self.security_id)
+            self._standalone = None
+        else:
+            self.window_service = None
+            self.indicators = None
+            self._standalone = TickWindowService()
+            self._standalone_indicators = IndicatorService()
+            self._key = str(self.security_id)
+            for seconds in self.windows:
+                self._standalone.require(self._key, seconds)
+            for key in self.indicator_keys:
+                self._standalone_indicators.require(self._key, key)
+            self._scope = ExpressionScope(self._key, self._standalone, self._standalone_indicators)
+        self._fn = self._scope.compile(tree)
+
+    def required_windows(self):
+        return self.windows if self.window_service is not None else ()
+
+    def required_indicators(self):
+        return self.indicator_keys if self.indicators is not None else ()
+
+    def required_expressions(self):
+        return (self.tree,) if self._standalone is None else ()
+
+    def condition_met(self, price: float) -> bool:
+        if self._standalone is not None:
+            now = time.time()
+            self._standalone.record(self._key, price, now)
+            self._standalone_indicators.on_tick(self._key, price, now)
+        self._scope.begin_tick(price)
+        return bool(self._fn(price))
+
+    def describe(self, price: float = None) -> str:
+        if price:
+            return f"{self.symbol}: {self.expression} (current {price})"
+        return f"Triggers when {self.symbol}: {self.expression}"
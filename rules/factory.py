@@ -2,15 +2,26 @@
 from .above_rule import AboveRule
 from .below_rule import BelowRule
 from .percent_move_rule import PercentMoveRule
+from .crosses_above_rule import CrossesAboveRule
+from .crosses_below_rule import CrossesBelowRule
+from .within_range_rule import WithinRangeRule
+from .expression import ExpressionRule
 RULE_REGISTRY = {
     "ABOVE": AboveRule,
     "BELOW": BelowRule,
     "PERCENT_MOVE": PercentMoveRule,
-    # Future: "CROSSES_ABOVE": CrossesAboveRule,
-    #          "WITHIN_RANGE": RangeRule,
+    "CROSSES_ABOVE": CrossesAboveRule,
+    "CROSSES_BELOW": CrossesBelowRule,
+    "WITHIN_RANGE": WithinRangeRule,
+    "EXPR": ExpressionRule,
 }
 
-def create_rule_from_watch(watch):
+def create_rule_from_watch(watch, window_service=None, expression_pool=None):
+    """
+    Build the AlertRule for a watch row. `window_service` (a TickWindowService)
+    lets time-window rules share the security's tick history; `expression_pool`
+    (an ExpressionPool) shares compiled sub-expressions between EXPR watches.
+    """
     rule_type = watch["rule"].upper()
     rule_cls = RULE_REGISTRY.get(rule_type)
 
@@ -22,7 +33,25 @@ def create_rule_from_watch(watch):
             symbol=watch["symbol"],
             threshold_percent=watch["threshold"],
             window_minutes=watch.get("window_minutes", 10),
-            cooldown_minutes=watch.get("cooldown_minutes", 5)
+            cooldown_minutes=watch.get("cooldown_minutes", 5),
+            window_service=window_service,
+            security_id=watch.get("security_id"),
+        )
+    elif rule_type == "WITHIN_RANGE":
+        return rule_cls(
+            symbol=watch["symbol"],
+            threshold=watch["threshold"],
+            upper_threshold=watch.get("upper_threshold"),
+            cooldown_minutes=watch.get("cooldown_minutes", 5),
+        )
+    elif rule_type == "EXPR":
+        return rule_cls(
+            symbol=watch["symbol"],
+            expression=watch["expression"],
+            cooldown_minutes=watch.get("cooldown_minutes", 5),
+            window_service=window_service,
+            security_id=watch.get("security_id"),
+            pool=expression_pool,
         )
     else:
         return rule_cls(
@@ -1,3 +1,4 @@
+from collections import deque
 from datetime import datetime, timedelta
 from .base_rule import AlertRule
 
@@ -5,36 +6,56 @@ class PercentMoveRule(AlertRule):
     """
     Fires when the price changes by more than X% within a given time window.
     Example: alert if BTC changes ±3% within 10 minutes.
+
+    In the engine the rule reads the security's shared, LTT-timestamped
+    series from a TickWindowService (the engine records each tick before
+    evaluating). Without one it keeps its own wall-clock history.
     """
 
-    def __init__(self, symbol: str, threshold_percent: float, window_minutes: int = 10, cooldown_minutes: int = 5):
+    def __init__(self, symbol: str, threshold_percent: float, window_minutes: int = 10, cooldown_minutes: int = 5,
+                 window_service=None, security_id=None):
         super().__init__(symbol, threshold_percent, cooldown_minutes)
         self.window_minutes = window_minutes
-        self.history = []  # in-memory cache of (timestamp, price) tuples
+        self.window_service = window_service
+        self.security_id = str(security_id) if security_id is not None else None
+        self.history = deque()  # in-memory cache of (timestamp, price) tuples, standalone use only
+        self._reference_price = None
+
+    def required_windows(self) -> tuple:
+        return (self.window_minutes * 60,) if self.window_service is not None else ()
 
     def _update_history(self, price: float):
         """Keep only recent data within the window."""
         now = datetime.utcnow()
         self.history.append((now, price))
         cutoff = now - timedelta(minutes=self.window_minutes)
-        self.history = [(t, p) for (t, p) in self.history if t >= cutoff]
+        while self.history[0][0] < cutoff:
+            self.history.popleft()
+
+    def _oldest_price_in_window(self, price: float):
+        if self.window_service is None:
+            self._update_history(price)
+            return self.history[0][1]
+
+        now = self.window_service.last_time(self.security_id)
+        if now is None:
+            return None
+        return self.window_service.first_price_since(self.security_id, now - self.window_minutes * 60)
 
     def condition_met(self, price: float) -> bool:
         """Return True if price moved more than threshold % in window."""
-        self._update_history(price)
-
-        if not self.history:
-            return False
+        oldest_price = self._oldest_price_in_window(price)
+        self._reference_price = oldest_price
 
-        oldest_time, oldest_price = self.history[0]
-        if oldest_price == 0:
+        if not oldest_price:
             return False
 
         pct_move = ((price - oldest_price) / oldest_price) * 100
         return abs(pct_move) >= self.threshold  # trigger on ±X% change
 
     def describe(self, price: float = None) -> str:
-        direction = "UP" if price >= self.history[0][1] else "DOWN"
+        reference = self._reference_price if self._reference_price is not None else price
+        direction = "UP" if price >= reference else "DOWN"
         return (
             f"{self.symbol} moved {direction} by more than {self.threshold:.2f}% "
             f"in the last {self.window_minutes} minutes "
@@ -0,0 +1,95 @@
+# rules/rule_cache.py
+from .factory import create_rule_from_watch
+from .expression import ExpressionPool
+
+# Watch fields that change how a rule is built. Trigger-state columns
+# (last_triggered_at / last_triggered_state / enabled) are read from the watch
+# dict at evaluation time, so updating them must NOT rebuild the rule.
+RULE_FIELDS = ("rule", "symbol", "security_id", "threshold", "upper_threshold", "window_minutes",
+               "cooldown_minutes", "expression")
+
+
+def watch_fingerprint(watch: dict) -> tuple:
+    """Version of a watch row as far as its compiled rule is concerned."""
+    return tuple(watch.get(f) for f in RULE_FIELDS)
+
+
+class RuleCache:
+    """
+    Compiled AlertRule objects keyed by watch id.
+
+    Rules are built once and reused across ticks, so per-rule state
+    (cooldown manager, PercentMoveRule history) lives as long as the watch.
+    A cached rule is rebuilt only when the watch's fingerprint changes.
+
+    With a TickWindowService, time-window rules are bound to their
+    security's shared series, and the cache registers / releases the windows
+    each rule needs as rules come and go. Expression rules on a security
+    share compiled sub-expressions through the cache's ExpressionPool, and
+    those sub-expressions and the indicators they read are required /
+    released the same way.
+    """
+
+    def __init__(self, window_service=None, indicators=None):
+        self.window_service = window_service
+        self.indicators = indicators
+        self.expressions = ExpressionPool(window_service, indicators) if window_service is not None else None
+        self._rules = {}  # watch_id -> (fingerprint, rule)
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, watches):
+        """Compile rules for every watch (used on full reload)."""
+        for watch_id in list(self._rules):
+            self.remove(watch_id)
+        for w in watches:
+            try:
+                self.upsert(w)
+            except Exception as e:
+                print(f"[RuleCache] Could not compile watch {w.get('id')}: {e}")
+
+    def upsert(self, watch: dict):
+        """Insert or refresh the rule for a watch; no-op if its rule fields are unchanged."""
+        fp = watch_fingerprint(watch)
+        cached = self._rules.get(watch["id"])
+        if cached and cached[0] == fp:
+            return cached[1]
+        rule = create_rule_from_watch(watch, self.window_service, self.expressions)
+        # require before releasing the old rule's windows and indicators, so
+        # one both need never drops to zero references (and loses its history)
+        for seconds in rule.required_windows():
+            rule.window_service.require(rule.security_id, seconds)
+        for key in rule.required_indicators():
+            rule.indicators.require(rule.security_id, key)
+        for tree in rule.required_expressions():
+            self.expressions.require(rule.security_id, tree)
+        self.remove(watch["id"])
+        self._rules[watch["id"]] = (fp, rule)
+        return rule
+
+    def remove(self, watch_id):
+        cached = self._rules.pop(watch_id, None)
+        if cached is None:
+            return
+        rule = cached[1]
+        for seconds in rule.required_windows():
+            rule.window_service.release(rule.security_id, seconds)
+        for key in rule.required_indicators():
+            rule.indicators.release(rule.security_id, key)
+        for tree in rule.required_expressions():
+            self.expressions.release(rule.security_id, tree)
+
+    def get(self, watch: dict):
+        """Return the compiled rule for a watch, rebuilding it on a fingerprint mismatch."""
+        cached = self._rules.get(watch["id"])
+        if cached and cached[0] == watch_fingerprint(watch):
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return self.upsert(watch)
+
+    def stats(self):
+        return {"size": len(self._rules), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._rules)
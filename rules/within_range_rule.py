@@ -0,0 +1,23 @@
+from .base_rule import AlertRule
+
+class WithinRangeRule(AlertRule):
+    """
+    Fires when the price enters the band [threshold, upper_threshold]
+    (both inclusive) and re-arms once it leaves it.
+    """
+
+    def __init__(self, symbol: str, threshold: float, upper_threshold: float, cooldown_minutes: int = 5):
+        if upper_threshold is None:
+            raise ValueError("WITHIN_RANGE needs an upper threshold")
+        low, high = sorted((float(threshold), float(upper_threshold)))
+        super().__init__(symbol, low, cooldown_minutes)
+        self.upper_threshold = high
+
+    def condition_met(self, price: float) -> bool:
+        return self.threshold <= price <= self.upper_threshold
+
+    def describe(self, price: float = None) -> str:
+        band = f"{self.threshold}–{self.upper_threshold}"
+        if price:
+            return f"{self.symbol} moved INTO range {band} (current {price})"
+        return f"Triggers when {self.symbol} trades within {band}"